@@ -56,7 +56,7 @@ def create_comment_message(
 ):
     """创建新的消息"""
     # 获取用户信息
-    user = user_repository.get_by_openid(db, openid)
+    user = user_repository.get_snapshot_by_openid(db, openid)
     if not user:
         raise HTTPException(status_code=400, detail="未绑定用户")
     # 添加用户ID到消息数据
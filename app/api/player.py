@@ -1,14 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, Any
+import json
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional
 from sqlalchemy.orm import Session
 
 from app.schemas.song import PlayerPlayedRequest, CurrentSongResponse
 from app.db.repositories import song_request_repository
 from app.db.session import get_db
 from app.core.security import require_admin
+from app.services.events import event_broker
+from app.services.prefetch import cached_song_media
 
 router = APIRouter()
 
+# 队列ETag的进程标识：内容版本号只在本进程内有意义，多进程或重启后不能互相命中
+QUEUE_ETAG_EPOCH = uuid.uuid4().hex[:8]
+
+
+def transition_or_raise(db: Session, request_id: int, status: str) -> None:
+    """按状态转换表更新歌曲请求，失败时给出具体原因"""
+    if song_request_repository.update_song_request_status(db, request_id, status):
+        return
+    current_status = song_request_repository.get_song_request_status(db, request_id)
+    if not current_status:
+        raise HTTPException(status_code=404, detail="请求ID无效或歌曲未找到")
+    raise HTTPException(status_code=400, detail=f"歌曲请求当前为{current_status}状态，无法标记为{status}")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断If-None-Match请求头是否命中当前ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
 @router.get("/queue",summary="获取歌曲队列",description="获取已批准的歌曲队列",
             responses={
                 200: {
@@ -21,29 +49,96 @@ router = APIRouter()
                                         "id": 123,
                                         "title": "Example Song",
                                         "artist": "Artist Name",
+                                        "duration": 240000,
+                                        "cover": "https://example.com/cover.jpg",
                                         "requester_name": "用户名",
-                                        "created_at": "2024-01-01T00:00:00"
+                                        "created_at": "2024-01-01T00:00:00",
+                                        "media": {
+                                            "url": "https://example.com/song.mp3",
+                                            "br": 128000,
+                                            "size": 3456789,
+                                            "detail": {
+                                                "id": "456",
+                                                "name": "Example Song",
+                                                "artists": ["Artist Name"],
+                                                "album": "Album",
+                                                "duration": 240000,
+                                                "cover": "https://example.com/cover.jpg"
+                                            }
+                                        }
                                     }
                                 ]
                             }
                         }
                     }
                 },
-                404: {
-                    "description": "没有找到已批准的歌曲队列",
-                    "content": {
-                        "application/json": {
-                            "example": {"detail": "没有找到已批准的歌曲队列"}
-                        }
-                    }
+                304: {
+                    "description": "队列未变化（请求头If-None-Match与当前ETag一致）"
                 }
             })
-def player_queue(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def player_queue(
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> Response:
     """
     获取已批准的歌曲队列
+    media为后台预取的播放地址和详情，尚未预取的歌曲为null，播放器需自行解析。
+    队列来自进程内快照，只在点歌请求状态变化时重建；响应带有ETag，
+    客户端携带If-None-Match轮询时，队列未变化则返回304。
+    ETag由进程标识、快照的内容版本号和各歌曲的播放地址组成，未变化时不必序列化队列。
     """
-    songs = song_request_repository.get_approved_song_queue(db)
-    return {"queue": songs}
+    generation, songs = song_request_repository.get_approved_song_queue_snapshot(db)
+    media = [cached_song_media(str(song["song_id"])) for song in songs]
+    headers = {}
+    if generation is not None:
+        media_key = tuple(
+            (item["url"], item["detail"] is not None) if item is not None else None
+            for item in media
+        )
+        etag = f'"{QUEUE_ETAG_EPOCH}-{generation}-{hash(media_key) & 0xffffffffffffffff:016x}"'
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        headers["ETag"] = etag
+    queue = [{**song, "media": item} for song, item in zip(songs, media)]
+    body = json.dumps(jsonable_encoder({"queue": queue}), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.post("/playing",description="标记歌曲开始播放",summary="标记歌曲为正在播放",
+             responses={
+                    200: {
+                        "description": "成功标记歌曲为正在播放",
+                        "content": {
+                            "application/json": {
+                                "example": {"success": True}
+                            }
+                        }
+                    },
+                    400: {
+                        "description": "歌曲当前状态不允许开始播放",
+                        "content": {
+                            "application/json": {
+                                "example": {"detail": "歌曲请求当前为pending状态，无法标记为playing"}
+                            }
+                        }
+                    },
+                    404: {
+                        "description": "请求ID无效或歌曲未找到",
+                        "content": {
+                            "application/json": {
+                                "example": {"detail": "请求ID无效或歌曲未找到"}
+                            }
+                        }
+                    }
+             })
+def player_playing(
+    data: PlayerPlayedRequest, 
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    标记歌曲为正在播放（仅限已批准的歌曲）
+    """
+    transition_or_raise(db, data.request_id, "playing")
+    return {"success": True}
 
 @router.post("/played",description="标记歌曲已播放",summary="标记歌曲为已播放",
              responses={
@@ -55,6 +150,14 @@ def player_queue(db: Session = Depends(get_db)) -> Dict[str, Any]:
                             }
                         }
                     },
+                    400: {
+                        "description": "歌曲当前状态不允许标记为已播放",
+                        "content": {
+                            "application/json": {
+                                "example": {"detail": "歌曲请求当前为pending状态，无法标记为played"}
+                            }
+                        }
+                    },
                     404: {
                         "description": "请求ID无效或歌曲未找到",
                         "content": {
@@ -69,7 +172,40 @@ def player_played(
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """
-    标记歌曲为已播放
+    标记歌曲为已播放（正在播放或已批准的歌曲）
+    """
+    transition_or_raise(db, data.request_id, "played")
+    return {"success": True}
+
+@router.get("/events",summary="订阅队列变化",description="以Server-Sent Events推送点歌请求的状态变化",
+            response_class=StreamingResponse,
+            responses={
+                200: {
+                    "description": "事件流",
+                    "content": {
+                        "text/event-stream": {
+                            "example": "id: 1a2b3c4d-12\nevent: approved\ndata: {\"request_id\": 123, \"song_id\": \"456\", \"song_name\": \"Example Song\", \"status\": \"approved\"}\n\n"
+                        }
+                    }
+                }
+            })
+async def player_events(
+    last_event_id: Optional[str] = Header(None),
+    since: Optional[str] = Query(None, description="从该事件ID之后续传（无法设置请求头的客户端使用）")
+) -> StreamingResponse:
+    """
+    订阅队列变化
+
+    事件类型为 requested / approved / rejected / playing / played，data中包含request_id、song_id、song_name和status。
+    断线重连时携带Last-Event-ID请求头（或since参数）可补发错过的事件；
+    收到reset事件表示无法续传，客户端应重新获取 /player/queue。
+    空闲时定期发送心跳注释，保持连接不被代理断开。
     """
-    song_request_repository.update_song_request_status(db, data.request_id, "played")
-    return {"success": True}
\ No newline at end of file
+    return StreamingResponse(
+        event_broker.stream(last_event_id or since),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
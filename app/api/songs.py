@@ -7,10 +7,21 @@ from app.schemas.song import (
     SongStatisticsResponse, 
     SongHistoryResponse, 
     SongReviewRequest,
+    SongBulkReviewRequest,
+    SongBulkReviewResponse,
+    SongBulkReviewResult,
     PendingSongListResponse,
-    SongRequestResponse
+    SongRequestResponse,
+    SongDetailResponse
+)
+from app.services.music_api import (
+    async_music_api_service,
+    search_cache,
+    song_url_cache,
+    song_detail_cache,
+    music_api_breaker,
+    DETAIL_BATCH_SIZE
 )
-from app.services.music_api import music_api_service
 from app.db.repositories import song_request_repository
 from app.db.session import get_db
 from app.core.security import require_admin
@@ -53,11 +64,11 @@ router = APIRouter()
             }
             )
 
-def search_songs(query: str = Query(..., min_length=1), 
+async def search_songs(query: str = Query(..., min_length=1), 
                  source: str|None = None, 
                  count: int = 30, 
                  page: int = 1) -> Dict[str, List[Song]]:
-    songs = music_api_service.search_songs(query, source, count, page)
+    songs = await async_music_api_service.search_songs(query, source, count, page)
     return {"songs": songs}
 
 @router.get("/geturl",summary="获取歌曲URL",description="获取歌曲的播放URL",
@@ -83,10 +94,41 @@ def search_songs(query: str = Query(..., min_length=1),
                     }
                 }
             })
-def get_song_url(id: str = Query(..., description="Song ID"), 
+async def get_song_url(id: str = Query(..., description="Song ID"), 
                  source: str|None = None,
                  br: str|None = None) -> Dict[str, Any]:
-    return music_api_service.get_song_url(id, source, br)
+    return await async_music_api_service.get_song_url(id, source, br)
+
+
+@router.get("/songs/detail",
+            response_model=SongDetailResponse,
+            summary="批量获取歌曲详情",
+            description=f"根据逗号分隔的歌曲ID批量获取时长、封面、歌手等详情，一次最多{DETAIL_BATCH_SIZE}首",
+            responses={
+                400: {
+                    "description": "查询参数错误",
+                    "content": {
+                        "application/json": {
+                            "example": {"detail": "查询参数错误"}
+                        }
+                    }
+                }
+            })
+async def get_song_details(ids: str = Query(..., min_length=1, description="歌曲ID，多个以逗号分隔")) -> SongDetailResponse:
+    song_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not song_ids or len(song_ids) > DETAIL_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail="查询参数错误")
+    
+    try:
+        details = await async_music_api_service.get_song_details(song_ids)
+    except Exception as e:
+        print(f"Error getting song details: {e}")
+        raise HTTPException(status_code=502, detail="获取歌曲详情失败")
+    
+    return SongDetailResponse(
+        songs=[Song(**details[song_id]) for song_id in song_ids if song_id in details],
+        missing=[song_id for song_id in song_ids if song_id not in details]
+    )
 
 
 @router.get("/songs/admin/statistics",
@@ -102,6 +144,22 @@ def get_song_statistics(
     return SongStatisticsResponse(**stats)
 
 
+@router.get("/songs/admin/cache",
+            response_model=Dict[str, Dict[str, Any]],
+            summary="获取音乐缓存统计",
+            description="获取音乐接口缓存的命中统计和上游熔断器状态（管理员功能）")
+def get_music_cache_stats(
+    admin_user = Depends(require_admin)
+) -> Dict[str, Dict[str, Any]]:
+    """获取音乐缓存统计（管理员功能）"""
+    return {
+        "search": search_cache.stats(),
+        "song_url": song_url_cache.stats(),
+        "song_detail": song_detail_cache.stats(),
+        "breaker": music_api_breaker.stats()
+    }
+
+
 @router.get("/songs/admin/history",
             response_model=SongHistoryResponse,
             summary="获取歌曲历史记录",
@@ -110,16 +168,21 @@ def get_song_history(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     date: Optional[str] = Query(None, description="日期筛选 (YYYY-MM-DD)"),
+    cursor: Optional[str] = Query(None, description="分页游标，取上一页返回的next_cursor；传入时忽略page"),
     db: Session = Depends(get_db),
     admin_user = Depends(require_admin)
 ) -> SongHistoryResponse:
     """获取歌曲历史记录（管理员功能）"""
-    history_data = song_request_repository.get_song_history(
-        db=db,
-        page=page,
-        page_size=page_size,
-        date=date
-    )
+    try:
+        history_data = song_request_repository.get_song_history(
+            db=db,
+            page=page,
+            page_size=page_size,
+            date=date,
+            cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="查询参数错误")
     return SongHistoryResponse(**history_data)
 
 
@@ -131,20 +194,66 @@ def get_pending_songs(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     status: Optional[str] = Query(None, description="状态筛选: pending, approved, rejected"),
+    cursor: Optional[str] = Query(None, description="分页游标，取上一页返回的next_cursor；传入时忽略page"),
     db: Session = Depends(get_db),
     admin_user = Depends(require_admin)
 ) -> PendingSongListResponse:
     """获取待审核歌曲列表（管理员功能）"""
     status_filter = [status] if status else None
-    pending_data = song_request_repository.get_pending_songs_for_review(
-        db=db,
-        page=page,
-        page_size=page_size,
-        status_filter=status_filter
-    )
+    try:
+        pending_data = song_request_repository.get_pending_songs_for_review(
+            db=db,
+            page=page,
+            page_size=page_size,
+            status_filter=status_filter,
+            cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="查询参数错误")
     return PendingSongListResponse(**pending_data)
 
 
+@router.post("/songs/admin/review",
+             response_model=SongBulkReviewResponse,
+             summary="批量审核歌曲请求",
+             description="一次通过或拒绝多条歌曲请求，每条可附带理由；只有待审核的请求会被更新（管理员功能）")
+def bulk_review_song_requests(
+    review_data: SongBulkReviewRequest,
+    db: Session = Depends(get_db),
+    admin_user = Depends(require_admin)
+) -> SongBulkReviewResponse:
+    """批量审核歌曲请求（管理员功能）"""
+    # 同一ID只保留第一条
+    reviews = {}
+    for item in review_data.items:
+        reviews.setdefault(item.request_id, (item.request_id, item.status, item.reason or ""))
+
+    outcomes = song_request_repository.bulk_review(db, list(reviews.values()), reviewer_id=admin_user.id)
+
+    results = []
+    for outcome in outcomes:
+        if outcome["new_status"] is not None:
+            results.append(SongBulkReviewResult(
+                request_id=outcome["request_id"], success=True, status=outcome["new_status"]
+            ))
+        elif outcome["current_status"] is None:
+            results.append(SongBulkReviewResult(
+                request_id=outcome["request_id"], success=False, detail="歌曲请求不存在"
+            ))
+        else:
+            results.append(SongBulkReviewResult(
+                request_id=outcome["request_id"],
+                success=False,
+                status=outcome["current_status"],
+                detail=f"歌曲请求已经是{outcome['current_status']}状态，无法重复审核"
+            ))
+
+    return SongBulkReviewResponse(
+        updated=sum(result.success for result in results),
+        results=results
+    )
+
+
 @router.put("/songs/admin/review/{request_id}",
             response_model=SongRequestResponse,
             summary="审核歌曲请求",
@@ -156,37 +265,20 @@ def review_song_request(
     admin_user = Depends(require_admin)
 ) -> SongRequestResponse:
     """审核歌曲请求（管理员功能）"""
-    # 检查请求是否存在
-    current_status = song_request_repository.get_song_request_status(db, request_id)
-    if not current_status:
-        raise HTTPException(status_code=404, detail="歌曲请求不存在")
-    
-    # 检查是否已经审核过
-    if current_status != "pending":
-        raise HTTPException(status_code=400, detail=f"歌曲请求已经是{current_status}状态，无法重复审核")
-    
-    # 执行审核
+    # 只有待审核的请求可以被审核；两个管理员同时审核时只有一个成功
     updated_request = song_request_repository.update_song_request_status(
         db=db,
         request_id=request_id,
         status=review_data.status,
         reason=review_data.reason or "",
-        reviewer_id=admin_user.id
+        reviewer_id=admin_user.id,
+        expected="pending"
     )
     
     if not updated_request:
-        raise HTTPException(status_code=500, detail="审核失败")
+        current_status = song_request_repository.get_song_request_status(db, request_id)
+        if not current_status:
+            raise HTTPException(status_code=404, detail="歌曲请求不存在")
+        raise HTTPException(status_code=400, detail=f"歌曲请求已经是{current_status}状态，无法重复审核")
     
-    response_data = {
-        "id": updated_request.id,
-        "song_id": updated_request.song_id,
-        "song_name": updated_request.song_name,
-        "status": updated_request.status,
-        "request_time": updated_request.request_time,
-        "review_time": updated_request.review_time,
-        "review_reason": updated_request.review_reason,
-        "user_id": updated_request.user_id,
-        "user_name": updated_request.user.name if updated_request.user else None,
-        "user_student_id": updated_request.user.student_id if updated_request.user else None
-    }
-    return SongRequestResponse(**response_data)
+    return SongRequestResponse(**updated_request)
@@ -37,9 +37,11 @@ def get_wall_messages(
 ):
     """获取墙消息列表"""
     skip = (page - 1) * page_size
+    total = None
     
     if keyword:
-        messages = wall_repository.search_messages(
+        # 搜索结果与总数一起返回
+        messages, total = wall_repository.search_messages(
             db=db,
             keyword=keyword,
             message_type=message_type,
@@ -70,13 +72,14 @@ def get_wall_messages(
             limit=page_size
         )
     
-    total = wall_repository.count_messages(
-        db=db,
-        message_type=message_type,
-        status=status,
-        keyword=keyword,
-        user_id=user_id
-    )
+    if total is None:
+        total = wall_repository.count_messages(
+            db=db,
+            message_type=message_type,
+            status=status,
+            keyword=keyword,
+            user_id=user_id
+        )
     has_next = len(messages) == page_size
     
     return WallMessageListResponse(
@@ -137,7 +140,7 @@ def create_wall_message(
 ):
     """创建新的墙消息"""
     # 获取用户信息
-    user = user_repository.get_by_openid(db, openid)
+    user = user_repository.get_snapshot_by_openid(db, openid)
     if not user:
         raise HTTPException(status_code=400, detail="未绑定用户")
     
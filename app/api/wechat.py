@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, Any
 from sqlalchemy.orm import Session
 from app.core.config import settings
@@ -6,11 +7,20 @@ from app.schemas.auth import LoginRequest, BindRequest, RefreshTokenRequest, Tok
 from app.schemas.song import SongRequest
 from app.services.auth import create_token_pair, verify_wechat_code, verify_refresh_token
 from app.db.repositories import user_repository, song_request_repository
+from app.db.repositories.song_request import REJECT_DUPLICATE, REJECT_RATE_LIMITED, REJECT_TOO_MANY
+from app.core.ratelimit import song_request_limiter
 from app.core.security import get_openid
 from app.db.session import get_db
 
 router = APIRouter()
 
+# 点歌拒绝原因 -> 提示信息
+SONG_REQUEST_REJECTIONS = {
+    REJECT_RATE_LIMITED: f"{settings.SONG_REQUEST_WINDOW_MINUTES}分钟内只能点{settings.SONG_REQUEST_WINDOW_QUOTA}次歌，请稍后再试",
+    REJECT_DUPLICATE: "你或别人已经点过这首歌了",
+    REJECT_TOO_MANY: f"你最多只能有{settings.SONG_REQUEST_MAX_ACTIVE}首未审核通过或未播放的歌曲"
+}
+
 
 @router.post("/login", response_model=TokenResponse,
              summary="微信小程序登录",
@@ -24,18 +34,26 @@ router = APIRouter()
                                 "example": {"detail": "无效的code或其他错误"}
                             }
                         }
+                    },
+                    503: {
+                        "description": "微信服务响应超时，需要重新调用wx.login获取新的code后重试",
+                        "content": {
+                            "application/json": {
+                                "example": {"detail": "微信服务响应超时，请重新登录"}
+                            }
+                        }
                     }
                 }
              )
-def login_wechat(data: LoginRequest, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    result = verify_wechat_code(data.code)
+async def login_wechat(data: LoginRequest, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    result = await verify_wechat_code(data.code)
 
     if not result["success"]:
-        raise HTTPException(status_code=400, detail=result["msg"])
+        raise HTTPException(status_code=503 if result.get("retryable") else 400, detail=result["msg"])
 
     openid = result["openid"]
-    # 使用新的token对生成函数
-    tokens = create_token_pair(openid, db)
+    # 使用新的token对生成函数，数据库操作放到线程池中执行，避免阻塞事件循环
+    tokens = await run_in_threadpool(create_token_pair, openid, db)
 
     return tokens
 
@@ -119,7 +137,7 @@ def is_bound(
         db: Session = Depends(get_db),
         openid: str = Depends(get_openid)
 ) -> Dict[str, bool]:
-    user = user_repository.get_by_openid(db, openid)
+    user = user_repository.get_snapshot_by_openid(db, openid)
     return {"is_bound": user is not None}
 
 
@@ -156,7 +174,7 @@ def song_request(
     """
     用户提交点歌请求，系统会进行一系列检查，包括用户绑定状态、点歌频率、重复点歌检查等。
 
-    ### 限制条件:
+    ### 限制条件（默认值，可通过环境变量配置）:
     - 用户必须已绑定学生账号
     - 普通用户30分钟内只能点一首歌
     - 不能重复点已经在队列中的歌曲
@@ -171,27 +189,28 @@ def song_request(
     - **msg**: 结果消息
     """
     # 获取用户
-    user = user_repository.get_by_openid(db, openid)
+    user = user_repository.get_snapshot_by_openid(db, openid)
     if not user:
         raise HTTPException(status_code=400, detail="未绑定用户")
 
-    user_id = user.id
     is_admin = user.is_admin or openid in settings.ADMIN_OPENIDS
 
-    # 检查用户在最近30分钟内是否已经请求过歌曲
-    if not is_admin and song_request_repository.check_recent_song_requests(db, user_id) > 0:  # type: ignore
-        raise HTTPException(status_code=400, detail="30分钟内只能点一次歌，请稍后再试")
-
-    # 检查用户是否已经请求过这首歌
-    if song_request_repository.check_song_already_requested(db, user_id, data.song_id):  # type: ignore
-        raise HTTPException(status_code=400, detail="你或别人已经点过这首歌了")
+    # 内存中的滑动窗口先拦下频繁重试：额度已满时直接拒绝，不访问数据库（见SlidingWindowLimiter）
+    if not is_admin and not song_request_limiter.allow(user.id):
+        raise HTTPException(status_code=400, detail=SONG_REQUEST_REJECTIONS[REJECT_RATE_LIMITED])
 
-    # 检查用户是否有太多未审核/已批准的歌曲
-    if not is_admin and song_request_repository.count_pending_approved_songs(db, user_id) >= 3:  # type: ignore
-        raise HTTPException(status_code=400, detail="你最多只能有3首未审核通过或未播放的歌曲")
+    # 频率限制、重复点歌、数量限制的检查与创建请求在一条语句中完成
+    request_id, reason = song_request_repository.admit_song_request(
+        db, user.id, data.song_id, data.song_name, is_admin,
+        minutes=settings.SONG_REQUEST_WINDOW_MINUTES,
+        quota=settings.SONG_REQUEST_WINDOW_QUOTA,
+        max_active=settings.SONG_REQUEST_MAX_ACTIVE
+    )
+    if reason is not None:
+        raise HTTPException(status_code=400, detail=SONG_REQUEST_REJECTIONS[reason])
 
-    # 创建歌曲请求
-    song_request_repository.create_song_request(db, user_id, data.song_id, data.song_name)  # type: ignore
+    if not is_admin:
+        song_request_limiter.record(user.id, request_id)
 
     return {"success": True, "msg": "点歌成功，等待审核"}
 
@@ -207,7 +226,7 @@ def get_all_song_requests_of_user(
     """
     获取用户的所有点歌请求
     """
-    user = user_repository.get_by_openid(db, openid)
+    user = user_repository.get_snapshot_by_openid(db, openid)
     if not user:
         raise HTTPException(status_code=400, detail="未绑定用户")
 
@@ -228,7 +247,7 @@ def get_user_info(
     """
     获取用户信息
     """
-    user = user_repository.get_by_openid(db, openid)
+    user = user_repository.get_snapshot_by_openid(db, openid)
     if not user:
         raise HTTPException(status_code=400, detail="未绑定用户")
 
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    线程安全的进程内TTL + LRU缓存
+
+    条目写入ttl秒内为新鲜状态；之后的stale_ttl秒内为陈旧状态，
+    只能通过lookup读取（用于stale-while-revalidate）。
+    容量达到maxsize时淘汰最久未使用的条目。
+    """
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最大条目数
+            ttl: 条目保持新鲜的时间（秒）
+            stale_ttl: 过了新鲜期后仍可作为陈旧数据返回的时间（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        # key -> (新鲜截止时间, 过期时间, 值)
+        self._data: "OrderedDict[Hashable, Tuple[float, float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[V, bool]]:
+        """获取条目，返回(值, 是否陈旧)；不存在或已过期时返回None"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            fresh_until, expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            stale = fresh_until <= now
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return value, stale
+
+    def peek(self, key: Hashable) -> Optional[Tuple[V, bool]]:
+        """与lookup相同地返回(值, 是否陈旧)，但不计入命中统计、不调整LRU顺序"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+        if item is None:
+            return None
+        fresh_until, expires_at, value = item
+        if expires_at <= now:
+            return None
+        return value, fresh_until <= now
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[V]:
+        """获取新鲜的条目，不存在、已陈旧或已过期时返回default"""
+        result = self.lookup(key)
+        if result is None or result[1]:
+            return default
+        return result[0]
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None, stale_ttl: Optional[float] = None) -> None:
+        """写入条目，ttl/stale_ttl为空时使用默认值"""
+        fresh_until = time.monotonic() + (self.ttl if ttl is None else ttl)
+        expires_at = fresh_until + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        with self._lock:
+            self._data[key] = (fresh_until, expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Optional[V]:
+        """移除并返回条目"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[2] if item is not None else default
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """命中统计"""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
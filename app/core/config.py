@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-from typing import List
+from typing import FrozenSet, List
 
 # 加载环境变量
 load_dotenv()
@@ -26,22 +26,91 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_HOURS: int = 24
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     
+    # 身份缓存配置（openid -> 用户快照）
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+    
+    # 已验证访问令牌缓存配置（令牌摘要 -> payload）
+    TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "3600"))
+    TOKEN_CACHE_MAX_SIZE: int = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "20000"))
+    
     # WeChat配置
     WECHAT_APPID: str = os.getenv("WECHAT_APPID","ber")
     WECHAT_SECRET: str = os.getenv("WECHAT_SECRET","ber")
+    WECHAT_API_BASE_URL: str = os.getenv("WECHAT_API_BASE_URL", "https://api.weixin.qq.com")
+    WECHAT_CONNECT_TIMEOUT: float = float(os.getenv("WECHAT_CONNECT_TIMEOUT", "3"))
+    WECHAT_READ_TIMEOUT: float = float(os.getenv("WECHAT_READ_TIMEOUT", "5"))
+    WECHAT_MAX_CONNECTIONS: int = int(os.getenv("WECHAT_MAX_CONNECTIONS", "20"))
+    WECHAT_MAX_CONCURRENCY: int = int(os.getenv("WECHAT_MAX_CONCURRENCY", "50"))
+    WECHAT_MAX_RETRIES: int = int(os.getenv("WECHAT_MAX_RETRIES", "2"))
     
     # 音乐API配置
-    MUSIC_API_BASE_URL: str = "http://127.0.0.1:3000"
+    MUSIC_API_BASE_URL: str = os.getenv("MUSIC_API_BASE_URL", "http://127.0.0.1:3000")
     DEFAULT_LIMIT:int = 30
+    # 上游请求的连接/读取超时（秒）和连接池上限
+    MUSIC_API_CONNECT_TIMEOUT: float = float(os.getenv("MUSIC_API_CONNECT_TIMEOUT", "2"))
+    MUSIC_API_TIMEOUT: float = float(os.getenv("MUSIC_API_TIMEOUT", "5"))
+    MUSIC_API_MAX_CONNECTIONS: int = int(os.getenv("MUSIC_API_MAX_CONNECTIONS", "50"))
+    MUSIC_API_MAX_KEEPALIVE: int = int(os.getenv("MUSIC_API_MAX_KEEPALIVE", "20"))
+    # 搜索结果缓存：新鲜期、陈旧可用期（秒）和容量
+    MUSIC_SEARCH_CACHE_TTL: int = int(os.getenv("MUSIC_SEARCH_CACHE_TTL", "300"))
+    MUSIC_SEARCH_CACHE_STALE_TTL: int = int(os.getenv("MUSIC_SEARCH_CACHE_STALE_TTL", "3600"))
+    MUSIC_SEARCH_CACHE_SIZE: int = int(os.getenv("MUSIC_SEARCH_CACHE_SIZE", "2000"))
+    # 播放地址缓存：上游未给出有效期时的默认值、提前淘汰的余量、提前刷新的窗口（秒）和容量
+    MUSIC_URL_DEFAULT_EXPIRY: int = int(os.getenv("MUSIC_URL_DEFAULT_EXPIRY", "1200"))
+    MUSIC_URL_EXPIRY_MARGIN: int = int(os.getenv("MUSIC_URL_EXPIRY_MARGIN", "60"))
+    MUSIC_URL_REFRESH_AHEAD: int = int(os.getenv("MUSIC_URL_REFRESH_AHEAD", "300"))
+    MUSIC_URL_CACHE_SIZE: int = int(os.getenv("MUSIC_URL_CACHE_SIZE", "5000"))
+    # 歌曲详情缓存：存活时间（秒）和容量
+    MUSIC_DETAIL_CACHE_TTL: int = int(os.getenv("MUSIC_DETAIL_CACHE_TTL", "86400"))
+    MUSIC_DETAIL_CACHE_SIZE: int = int(os.getenv("MUSIC_DETAIL_CACHE_SIZE", "10000"))
+    # 音乐API熔断：连续失败次数阈值，以及熔断后多久（秒）放行探测请求
+    MUSIC_API_BREAKER_THRESHOLD: int = int(os.getenv("MUSIC_API_BREAKER_THRESHOLD", "5"))
+    MUSIC_API_BREAKER_RESET: int = int(os.getenv("MUSIC_API_BREAKER_RESET", "15"))
+    
+    # 播放队列预取：后台为队首的N首歌预先解析播放地址和详情
+    PLAYER_PREFETCH_ENABLED: bool = os.getenv("PLAYER_PREFETCH_ENABLED", "true").lower() in ("true", "1", "yes")
+    PLAYER_PREFETCH_COUNT: int = int(os.getenv("PLAYER_PREFETCH_COUNT", "5"))
+    # 轮询队列的间隔（秒），应小于MUSIC_URL_REFRESH_AHEAD，保证链接在过期前被刷新
+    PLAYER_PREFETCH_INTERVAL: int = int(os.getenv("PLAYER_PREFETCH_INTERVAL", "30"))
+    # 播放队列快照的最长保留时间（秒），用于感知其他进程对队列的修改
+    PLAYER_QUEUE_SNAPSHOT_TTL: int = int(os.getenv("PLAYER_QUEUE_SNAPSHOT_TTL", "5"))
+    # 播放器事件推送（SSE）：可补发的事件数、单个连接积压上限、心跳间隔（秒）
+    PLAYER_EVENTS_BUFFER: int = int(os.getenv("PLAYER_EVENTS_BUFFER", "256"))
+    PLAYER_EVENTS_QUEUE_SIZE: int = int(os.getenv("PLAYER_EVENTS_QUEUE_SIZE", "100"))
+    PLAYER_EVENTS_HEARTBEAT: int = int(os.getenv("PLAYER_EVENTS_HEARTBEAT", "15"))
+    
+    # 点歌限制：窗口（分钟）内最多提交的次数，以及待审核/已批准歌曲的数量上限（管理员不受限制）
+    SONG_REQUEST_WINDOW_MINUTES: int = int(os.getenv("SONG_REQUEST_WINDOW_MINUTES", "30"))
+    SONG_REQUEST_WINDOW_QUOTA: int = int(os.getenv("SONG_REQUEST_WINDOW_QUOTA", "1"))
+    SONG_REQUEST_MAX_ACTIVE: int = int(os.getenv("SONG_REQUEST_MAX_ACTIVE", "3"))
+    # 歌曲请求详情（歌名、歌手、时长、封面）后台回填：每批数量和空闲时的轮询间隔（秒）
+    SONG_BACKFILL_ENABLED: bool = os.getenv("SONG_BACKFILL_ENABLED", "true").lower() in ("true", "1", "yes")
+    SONG_BACKFILL_BATCH: int = int(os.getenv("SONG_BACKFILL_BATCH", "100"))
+    SONG_BACKFILL_INTERVAL: int = int(os.getenv("SONG_BACKFILL_INTERVAL", "60"))
+    # 歌曲请求归档：请求时间早于N天的已播放/已驳回请求分批移入归档表，每批数量和空闲时的轮询间隔（秒）
+    SONG_ARCHIVE_ENABLED: bool = os.getenv("SONG_ARCHIVE_ENABLED", "true").lower() in ("true", "1", "yes")
+    SONG_ARCHIVE_AFTER_DAYS: int = int(os.getenv("SONG_ARCHIVE_AFTER_DAYS", "30"))
+    if SONG_ARCHIVE_AFTER_DAYS < 1:
+        # 0或负数会把刚播放/刚驳回的请求立即移出热表
+        raise ValueError(f"SONG_ARCHIVE_AFTER_DAYS必须大于等于1，当前为{SONG_ARCHIVE_AFTER_DAYS}")
+    SONG_ARCHIVE_BATCH: int = int(os.getenv("SONG_ARCHIVE_BATCH", "1000"))
+    SONG_ARCHIVE_INTERVAL: int = int(os.getenv("SONG_ARCHIVE_INTERVAL", "3600"))
+    # 校园墙搜索排序：相关度随发布时间衰减，发布WALL_SEARCH_RECENCY_DAYS天后减半
+    WALL_SEARCH_RECENCY_DAYS: int = int(os.getenv("WALL_SEARCH_RECENCY_DAYS", "7"))
+    # 管理端歌曲统计的缓存时间（秒）
+    SONG_STATS_CACHE_TTL: int = int(os.getenv("SONG_STATS_CACHE_TTL", "10"))
+    # 管理端分页列表总数的缓存时间（秒）
+    SONG_LIST_TOTAL_TTL: int = int(os.getenv("SONG_LIST_TOTAL_TTL", "30"))
     
-    # 管理员openids
-    ADMIN_OPENIDS: List[str] = [
+    # 管理员openids（集合，便于O(1)判断）
+    ADMIN_OPENIDS: FrozenSet[str] = frozenset([
         'ojeMl5_7XpeJv0m3M5vE1EU51Gok',
         'ojeMl53DDXEqKVLxEb8WJnaN9Fck', 
         'ojeMl5xiY5Rpc31-cl2EzzYeP2BY',
         'ojeMl57IoAIFZXH-cKgB-_rYkx1s',
         'ojeMl5wp-gpIUw2TJiXZUUfZWPI8'
-    ]
+    ])
 
     PICTURE_UPLOAD_DIR: str = "static/pictures"
 
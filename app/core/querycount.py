@@ -0,0 +1,30 @@
+from contextvars import ContextVar
+from typing import Any, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 当前请求的SQL计数器；未开启计数时为None
+_query_counter: ContextVar[Optional[List[int]]] = ContextVar("query_counter", default=None)
+
+
+def _count_query(*args: Any) -> None:
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def install_query_counter(engine: Engine) -> None:
+    """在引擎上注册before_cursor_execute事件，统计每条实际发往数据库的语句"""
+    if not event.contains(engine, "before_cursor_execute", _count_query):
+        event.listen(engine, "before_cursor_execute", _count_query)
+
+
+def start_query_count() -> List[int]:
+    """
+    为当前上下文开启一个计数器并返回它
+    计数器是可变列表，同步接口在线程池中执行时复制的上下文仍指向同一个列表
+    """
+    counter = [0]
+    _query_counter.set(counter)
+    return counter
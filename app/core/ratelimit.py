@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+
+class SlidingWindowLimiter:
+    """
+    进程内的滑动窗口限流器
+
+    为每个key记录窗口内的事件（事件ID, 时间戳），窗口内的事件数达到quota时拒绝。
+    事件带有ID，被撤销（如点歌被驳回）时可以单独移除。
+    用在数据库检查之前：额度已满时直接拒绝，不再访问数据库；有剩余额度时仍由数据库检查决定。
+    状态只在本进程内更新（启动时从数据库重建），拒绝可能比数据库更严格：
+    多进程部署时，在其他进程被驳回或删除的请求，在本进程中要到窗口结束才释放额度。
+    每经过一个窗口清扫一次所有key，不再活跃的用户不会一直占用内存。
+    """
+    def __init__(self, window_seconds: float, quota: int):
+        self.window_seconds = window_seconds
+        self.quota = quota
+        self._events: Dict[Hashable, Deque[Tuple[Hashable, float]]] = {}
+        self._last_sweep = time.time()
+        self._lock = threading.Lock()
+
+    def _prune(self, key: Hashable, now: float) -> Optional[Deque[Tuple[Hashable, float]]]:
+        """移除窗口外的事件，返回剩余事件（没有时返回None）"""
+        events = self._events.get(key)
+        if events is None:
+            return None
+        cutoff = now - self.window_seconds
+        while events and events[0][1] <= cutoff:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def _sweep(self, now: float) -> None:
+        """距上次清扫已超过一个窗口时，移除所有窗口已空的key"""
+        if now - self._last_sweep < self.window_seconds:
+            return
+        self._last_sweep = now
+        for key in list(self._events):
+            self._prune(key, now)
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """key当前是否还有剩余额度（只检查，不记录）"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._sweep(now)
+            events = self._prune(key, now)
+            return events is None or len(events) < self.quota
+
+    def record(self, key: Hashable, event_id: Hashable, timestamp: Optional[float] = None) -> None:
+        """记录一次成功的事件"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._sweep(timestamp)
+            events = self._events.setdefault(key, deque())
+            events.append((event_id, timestamp))
+
+    def discard(self, key: Hashable, event_id: Hashable) -> None:
+        """撤销一次事件，释放其占用的额度"""
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                return
+            remaining = deque(event for event in events if event[0] != event_id)
+            if remaining:
+                self._events[key] = remaining
+            else:
+                del self._events[key]
+
+    def reset(self, events: Iterable[Tuple[Hashable, Hashable, float]]) -> None:
+        """用(key, 事件ID, 时间戳)重建全部状态"""
+        rebuilt: Dict[Hashable, Deque[Tuple[Hashable, float]]] = {}
+        for key, event_id, timestamp in sorted(events, key=lambda event: event[2]):
+            rebuilt.setdefault(key, deque()).append((event_id, timestamp))
+        with self._lock:
+            self._events = rebuilt
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+# 点歌频率限制：user_id -> 窗口内成功提交的请求
+song_request_limiter = SlidingWindowLimiter(
+    window_seconds=settings.SONG_REQUEST_WINDOW_MINUTES * 60,
+    quota=settings.SONG_REQUEST_WINDOW_QUOTA
+)
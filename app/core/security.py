@@ -1,28 +1,34 @@
+import hashlib
+import time
+from typing import Any, Dict
+
 import jwt
 from fastapi import HTTPException, Header, Depends
 from sqlalchemy.orm import Session
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.db.session import get_db
 from app.db.repositories.user import user_repository
 
-def get_openid(authorization: str = Header(...), db: Session = Depends(get_db)) -> str:
+# 已验证访问令牌缓存：令牌的SHA-256摘要 -> 解码后的payload
+access_token_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+def decode_access_token(token: str) -> Dict[str, Any]:
     """
-    从JWT令牌中获取openid
+    校验访问令牌并返回payload
+    已验证过且未过期的令牌直接从缓存返回，跳过签名校验和JSON解码
     """
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="认证信息缺失或格式错误")
-    
-    token = authorization.split(" ")[1]
-    
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = access_token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-        
-        # 确保这是访问令牌而不是刷新令牌
-        if payload.get("type") == "refresh":
-            raise HTTPException(status_code=401, detail="无效的令牌类型")
-            
-        return payload["openid"]
     except jwt.ExpiredSignatureError:
         # 当令牌过期时，返回特殊的状态码，前端可以捕获并尝试刷新
         raise HTTPException(status_code=401, detail="token已过期，请刷新")
@@ -30,13 +36,36 @@ def get_openid(authorization: str = Header(...), db: Session = Depends(get_db))
         print(e)
         raise HTTPException(status_code=401, detail="token无效")
 
+    # 确保这是访问令牌而不是刷新令牌
+    if payload.get("type") == "refresh":
+        raise HTTPException(status_code=401, detail="无效的令牌类型")
+    if "openid" not in payload:
+        raise HTTPException(status_code=401, detail="token无效")
+
+    # 缓存时间不超过令牌剩余有效期
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        access_token_cache.set(key, payload, ttl=min(remaining, settings.TOKEN_CACHE_TTL_SECONDS))
+    return payload
+
+
+def get_openid(authorization: str = Header(...)) -> str:
+    """
+    从JWT令牌中获取openid
+    """
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="认证信息缺失或格式错误")
+
+    token = authorization.split(" ")[1]
+    return decode_access_token(token)["openid"]
+
 
 def get_current_user(
     openid: str = Depends(get_openid),
     db: Session = Depends(get_db)
 ):
-    """获取当前用户"""
-    user = user_repository.get_by_openid(db, openid)
+    """获取当前用户（身份缓存中的不可变快照）"""
+    user = user_repository.get_snapshot_by_openid(db, openid)
     if not user:
         raise HTTPException(status_code=400, detail="未绑定用户")
     return user
@@ -45,7 +74,7 @@ def get_current_user(
 def require_admin(
     current_user = Depends(get_current_user)
 ):
-    """要求管理员权限"""
+    """要求管理员权限（用户信息来自身份缓存，角色变更最多在USER_CACHE_TTL_SECONDS秒后生效）"""
     if not current_user.is_admin and current_user.wechat_openid not in settings.ADMIN_OPENIDS:
         raise HTTPException(status_code=403, detail="需要管理员权限")
     return current_user
@@ -0,0 +1,50 @@
+import threading
+import time
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class VersionedSnapshot(Generic[T]):
+    """
+    带版本号的进程内快照
+
+    数据变化时调用invalidate使版本号加一，下次读取时重新加载；
+    max_age秒后也会重新加载，以便感知其他进程的修改。
+    加载期间发生的失效不会被旧数据覆盖。
+    另有内容版本号generation，只在重新加载的内容与上一份不同时加一，可用于生成ETag。
+    """
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self.version = 0
+        self.generation = 0
+        self._value: Optional[T] = None
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """标记快照已过时"""
+        with self._lock:
+            self.version += 1
+
+    def get(self, load: Callable[[], T]) -> Tuple[Optional[int], T]:
+        """
+        返回(内容版本号, 快照)，快照过时时调用load重新加载
+        加载期间快照又被失效时，返回的数据不会保存，内容版本号为None
+        """
+        with self._lock:
+            version = self.version
+            if self._loaded_version == version and time.monotonic() - self._loaded_at < self.max_age:
+                return self.generation, self._value  # type: ignore
+
+        value = load()
+        with self._lock:
+            if self.version != version:
+                return None, value
+            if self._loaded_version < 0 or value != self._value:
+                self.generation += 1
+            self._value = value
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+            return self.generation, value
@@ -1,7 +1,7 @@
 from app.db.models.user import User
-from app.db.models.song_request import SongRequest
+from app.db.models.song_request import SongRequest, SongRequestArchive
 from app.db.models.refresh_token import RefreshToken
 from app.db.models.wall import WallMessage
 
 # 导出所有模型
-__all__ = ["User", "SongRequest", "RefreshToken", "WallMessage"]
\ No newline at end of file
+__all__ = ["User", "SongRequest", "SongRequestArchive", "RefreshToken", "WallMessage"]
\ No newline at end of file
@@ -7,8 +7,8 @@ class RefreshToken(BaseModel):
     """刷新令牌模型"""
     __tablename__ = "refresh_tokens"
     
-    # 关联的微信openid
-    openid = Column(String, nullable=False, index=True)
+    # 关联的微信openid，每个用户只保留一条刷新令牌
+    openid = Column(String, nullable=False, unique=True, index=True)
     # 令牌ID
     token_id = Column(String, nullable=False, index=True)
     # 过期时间
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Index, text
 from sqlalchemy.orm import relationship
 
 from app.db.session import Base
@@ -14,7 +14,12 @@ class SongRequest(BaseModel):
     song_id = Column(String, nullable=False)
     # 歌曲名称，存储歌曲的名称
     song_name = Column(String, nullable=False)
-    # 状态：pending（待审核），approved（通过），rejected（驳回），played（已播放）
+    # 写入时确定的歌名、歌手、时长（毫秒）和封面，供队列直接读取；时长为空表示尚未回填
+    title = Column(String, nullable=True)
+    artist = Column(String, nullable=True)
+    duration = Column(Integer, nullable=True)
+    cover = Column(String, nullable=True)
+    # 状态：pending（待审核），approved（通过），rejected（驳回），playing（正在播放），played（已播放）
     status = Column(String, nullable=False, default="pending")
     # 请求时间
     request_time = Column(DateTime, nullable=False)
@@ -28,5 +33,60 @@ class SongRequest(BaseModel):
     # 关系
     user = relationship("User", back_populates="song_requests")
     
+    __table_args__ = (
+        # 按状态筛选并按请求时间排序/分页（队列、审核列表、历史记录）
+        Index("idx_song_requests_status_time", "status", "request_time", "id"),
+        # 不按状态筛选的历史记录（按日期范围和游标分页）
+        Index("idx_song_requests_time", "request_time", "id"),
+        # 用户维度的频率限制和数量限制
+        Index("idx_song_requests_user_status_time", "user_id", "status", "request_time"),
+        Index("idx_song_requests_song_id", "song_id"),
+        # 同一首歌同时只能有一条待审核或已批准的请求
+        Index(
+            "uix_song_requests_active_song_id",
+            "song_id",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'approved')")
+        ),
+        # 后台回填任务按ID倒序查找尚未回填详情的请求；回填完成后索引为空
+        Index("idx_song_requests_missing_duration", "id", postgresql_where=text("duration IS NULL")),
+    )
+    
+    def __repr__(self):
+        return f"<SongRequest {self.id} (song_id={self.song_id}, status={self.status})>"
+
+class SongRequestArchive(Base):
+    """
+    歌曲请求归档模型
+    早于归档期限的已播放/已驳回请求从song_requests整行移入此表（保留原ID），
+    使待审核、队列等活跃查询只扫描热数据；历史记录同时查询两张表。
+    """
+    __tablename__ = "song_requests_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    song_id = Column(String, nullable=False)
+    song_name = Column(String, nullable=False)
+    title = Column(String, nullable=True)
+    artist = Column(String, nullable=True)
+    duration = Column(Integer, nullable=True)
+    cover = Column(String, nullable=True)
+    # 状态：rejected（驳回）或played（已播放）
+    status = Column(String, nullable=False)
+    request_time = Column(DateTime, nullable=False)
+    review_time = Column(DateTime, nullable=True)
+    review_reason = Column(Text, nullable=True)
+    reviewer_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # 与热表相同的历史记录索引，UNION ALL后可按(request_time, id)归并
+        Index("idx_song_requests_archive_status_time", "status", "request_time", "id"),
+        Index("idx_song_requests_archive_time", "request_time", "id"),
+        # 用户查看自己的点歌记录
+        Index("idx_song_requests_archive_user_time", "user_id", "request_time"),
+    )
+
     def __repr__(self):
-        return f"<SongRequest {self.id} (song_id={self.song_id}, status={self.status})>"
\ No newline at end of file
+        return f"<SongRequestArchive {self.id} (song_id={self.song_id}, status={self.status})>"
@@ -1,6 +1,29 @@
 from datetime import datetime
 from app.db.models.base import BaseModel
-from sqlalchemy import Column, DateTime, Integer, String, Text, Boolean
+from sqlalchemy import DDL, Column, Computed, DateTime, Index, Integer, String, Text, Boolean, event, func
+
+
+# 搜索文本中字段之间的分隔符（单元分隔符），关键词中会去掉它，匹配不会跨越字段边界
+SEARCH_SEPARATOR = "\x1f"
+
+# 单字/双字索引只收录的汉字范围（扩展A、基本区、兼容汉字），Python和PostgreSQL正则通用的写法
+CJK_RANGES = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+
+# 1~2个汉字的关键词无法使用三元组索引：提取每条消息中全部由汉字组成的单字和双字，
+# 在表达式上建GIN索引，查询时用 wall_search_grams(search_text) @> ARRAY[关键词] 命中。
+# 只收录汉字，字母、数字和标点不产生元素，数组大小不超过消息中汉字数的两倍
+WALL_SEARCH_GRAMS_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION wall_search_grams(doc TEXT) RETURNS TEXT[]
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT coalesce(array_agg(DISTINCT gram), '{{}}')
+        FROM (
+            SELECT substr(doc, i, n) AS gram
+            FROM generate_series(1, char_length(doc)) AS i, (VALUES (1), (2)) AS sizes(n)
+            WHERE i + n - 1 <= char_length(doc)
+        ) grams
+        WHERE gram ~ '^[{CJK_RANGES}]+$'
+    $$
+"""
 
 
 # 消息类型常量
@@ -39,6 +62,44 @@ class WallMessage(BaseModel):
     view_count = Column(Integer, nullable=False, default=0, comment="浏览次数")
     like_count = Column(Integer, nullable=False, default=0, comment="点赞次数")
     timestamp = Column(DateTime, nullable=False, default=datetime.now, comment="发布时间")
+    # 搜索文本：标题、内容和标签以分隔符拼接而成的生成列，由数据库在插入和更新时维护
+    search_text = Column(
+        Text,
+        Computed(
+            f"coalesce(title, '') || '{SEARCH_SEPARATOR}' || content || '{SEARCH_SEPARATOR}' || coalesce(tags, '')",
+            persisted=True
+        ),
+        comment="搜索文本"
+    )
+    
+    __table_args__ = (
+        # pg_trgm三元组GIN索引，支持3个字符及以上关键词的任意位置子串匹配（LIKE '%关键词%'）
+        Index(
+            "idx_wall_messages_search_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"}
+        ),
+        # 1~2个汉字的关键词使用的单字/双字GIN表达式索引
+        Index(
+            "idx_wall_messages_search_grams",
+            func.wall_search_grams(search_text),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
     
     def __repr__(self):
-        return f"<WallMessage {self.id} by User {self.user_id}: {self.title or self.content[:50]}>"
\ No newline at end of file
+        return f"<WallMessage {self.id} by User {self.user_id}: {self.title or self.content[:50]}>"
+
+
+# 建表前先创建索引依赖的扩展和函数（由metadata建表时使用；已有的数据库由migrate.py创建）
+event.listen(
+    WallMessage.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+event.listen(
+    WallMessage.__table__,
+    "before_create",
+    DDL(WALL_SEARCH_GRAMS_FUNCTION).execute_if(dialect="postgresql")
+)
\ No newline at end of file
@@ -1,45 +1,67 @@
 from typing import Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 
 from app.db.models.refresh_token import RefreshToken
 from app.db.repositories.base import BaseRepository
 
 class RefreshTokenRepository(BaseRepository[RefreshToken, dict, dict]):# type: ignore
     """刷新令牌数据访问层"""
-    
+
     def save_refresh_token(
         self, db: Session, openid: str, token_id: str, expires_at: datetime
-    ) -> RefreshToken:
-        """保存刷新令牌"""
-        # 首先删除该用户的所有刷新令牌
-        db.query(RefreshToken).filter(RefreshToken.openid == openid).delete()
-        db.commit()
-        
-        # 创建新的刷新令牌
-        refresh_token = RefreshToken(
+    ) -> None:
+        """保存刷新令牌：每个openid只保留一条，按openid upsert，一条语句完成"""
+        now = datetime.now()
+        stmt = insert(RefreshToken).values(
             openid=openid,
             token_id=token_id,
             expires_at=expires_at,
-            created_at=datetime.now()
+            created_at=now,
+            updated_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RefreshToken.openid],
+            set_={
+                "token_id": stmt.excluded.token_id,
+                "expires_at": stmt.excluded.expires_at,
+                "created_at": stmt.excluded.created_at,
+                "updated_at": stmt.excluded.updated_at
+            }
         )
-        db.add(refresh_token)
+        db.execute(stmt)
         db.commit()
-        db.refresh(refresh_token)
-        return refresh_token
-    
-    def check_refresh_token_valid(self, db: Session, openid: str, token_id: str) -> bool:
-        """检查刷新令牌是否有效"""
-        return db.query(RefreshToken).filter(
-            RefreshToken.openid == openid,
-            RefreshToken.token_id == token_id,
-            RefreshToken.expires_at > datetime.now()
-        ).first() is not None
-    
+
+    def rotate_refresh_token(
+        self, db: Session, openid: str, old_token_id: str, new_token_id: str, expires_at: datetime
+    ) -> bool:
+        """
+        轮换刷新令牌
+        仅当旧令牌仍是该用户当前有效的令牌时，才原子地替换为新令牌；
+        并发的两次刷新只有一次能成功。
+        """
+        now = datetime.now()
+        stmt = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.openid == openid,
+                RefreshToken.token_id == old_token_id,
+                RefreshToken.expires_at > now
+            )
+            .values(token_id=new_token_id, expires_at=expires_at, updated_at=now)
+            .returning(RefreshToken.id)
+            .execution_options(synchronize_session=False)
+        )
+        rotated = db.execute(stmt).first() is not None
+        db.commit()
+        return rotated
+
     def invalidate_refresh_token(self, db: Session, openid: str) -> None:
         """使指定用户的所有刷新令牌失效"""
         db.query(RefreshToken).filter(RefreshToken.openid == openid).delete()
         db.commit()
 
 # 实例化仓库
-refresh_token_repository = RefreshTokenRepository(RefreshToken)
\ No newline at end of file
+refresh_token_repository = RefreshTokenRepository(RefreshToken)
@@ -1,53 +1,283 @@
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import base64
+import json
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, time, timedelta
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import Integer, String, Text, case, column, delete, exists, func, literal, select, tuple_, union_all, update, values
+from sqlalchemy.dialects.postgresql import insert
 
-from app.db.models.song_request import SongRequest
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.ratelimit import song_request_limiter
+from app.core.snapshot import VersionedSnapshot
+from app.db.models.song_request import SongRequest, SongRequestArchive
 from app.db.models.user import User
 from app.schemas.song import SongRequest as SongRequestSchema, SongRequestResponse
 from app.db.repositories.base import BaseRepository
-from app.services.music_api import music_api_service
+from app.services.events import event_broker, EVENT_REQUESTED
+from app.services.music_api import song_detail_cache
+
+# 占用队列位置的状态：同一首歌在这些状态下只能有一条请求（部分唯一索引）
+ACTIVE_STATUSES = ["pending", "approved"]
+
+# 计入点歌频率限制的状态（被驳回的请求不计入）
+COUNTED_STATUSES = ["pending", "approved", "playing", "played"]
+
+# 允许的状态转换：当前状态 -> 可转换到的状态
+# approved -> played 保留给不上报开始播放的旧版播放器
+STATUS_TRANSITIONS = {
+    "pending": {"approved", "rejected"},
+    "approved": {"playing", "played"},
+    "playing": {"played"},
+}
+
+# 审核产生的状态，转换时记录审核时间、理由和审核人
+REVIEW_STATUSES = {"approved", "rejected"}
+
+# 终态：不会再发生状态转换，超过归档期限后移入归档表
+FINISHED_STATUSES = ["rejected", "played"]
+
+# 点歌准入的事务级咨询锁命名空间（第二个参数为用户ID）
+ADMIT_LOCK_NAMESPACE = 1
+
+# 点歌被拒绝的原因
+REJECT_RATE_LIMITED = "rate_limited"
+REJECT_DUPLICATE = "duplicate"
+REJECT_TOO_MANY = "too_many"
+
+# 统计信息快照缓存
+STATISTICS_KEY = "statistics"
+statistics_cache: TTLCache[Dict[str, int]] = TTLCache(maxsize=1, ttl=settings.SONG_STATS_CACHE_TTL)
+
+# 归档表统计缓存：归档表只在归档任务移动数据时变化，保留到下一轮归档
+archive_statistics_cache: TTLCache[Dict[str, int]] = TTLCache(maxsize=1, ttl=settings.SONG_ARCHIVE_INTERVAL)
+
+# 分页列表总数缓存：(列表, 筛选条件) -> 总数
+list_total_cache: TTLCache[int] = TTLCache(maxsize=256, ttl=settings.SONG_LIST_TOTAL_TTL)
+
+# 已批准歌曲队列快照，只在请求新增或状态变化时重建
+queue_snapshot: VersionedSnapshot[List[Dict[str, Any]]] = VersionedSnapshot(max_age=settings.PLAYER_QUEUE_SNAPSHOT_TTL)
+
+def invalidate_song_snapshots() -> None:
+    """请求新增或状态变化后，使统计信息、列表总数和队列快照失效"""
+    statistics_cache.clear()
+    list_total_cache.clear()
+    queue_snapshot.invalidate()
+
+# 无法解析出歌手时的默认值
+UNKNOWN_ARTIST = "未知艺术家"
+
+def parse_song_name(song_name: str) -> Tuple[str, str]:
+    """从"歌手 - 歌名"格式的歌曲名称中提取(歌名, 歌手)，无法分离时歌手为默认值"""
+    title = str(song_name)
+    artist = UNKNOWN_ARTIST
+    if " - " in title:
+        parts = title.split(" - ", 1)
+        if len(parts) == 2:
+            artist = parts[0].strip()
+            title = parts[1].strip()
+    return title, artist
+
+def song_metadata(song_name: str, detail: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    计算写入歌曲请求的歌名、歌手、时长和封面
+    有歌曲详情时以详情为准，否则从歌曲名称中解析，时长和封面留空等待回填
+    """
+    if detail:
+        return {
+            "title": detail.get("name") or parse_song_name(song_name)[0],
+            "artist": " / ".join(name for name in detail.get("artists", []) if name) or parse_song_name(song_name)[1],
+            "duration": detail.get("duration") or 0,
+            "cover": detail.get("cover") or ""
+        }
+    title, artist = parse_song_name(song_name)
+    return {"title": title, "artist": artist, "duration": None, "cover": None}
+
+def display_title_artist(row: Any) -> Tuple[str, str]:
+    """队列展示用的(歌名, 歌手)：尚未写入或回填时按歌曲名称解析，与迁移脚本的预填一致"""
+    if row.title is None:
+        return parse_song_name(row.song_name)
+    return row.title, row.artist or UNKNOWN_ARTIST
+
+def encode_cursor(request_time: datetime, request_id: int) -> str:
+    """将(请求时间, ID)编码为不透明的分页游标"""
+    raw = json.dumps([request_time.isoformat(), request_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析分页游标，格式错误时抛出ValueError"""
+    try:
+        request_time, request_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(request_time), int(request_id)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
 
 class SongRequestRepository(BaseRepository[SongRequest, SongRequestSchema, SongRequestSchema]):
     """歌曲请求数据访问层"""
     
-    def check_recent_song_requests(self, db: Session, user_id: int, minutes: int = 30) -> int:
-        """检查用户最近的点歌请求"""
-        thirty_min_ago = datetime.now() - timedelta(minutes=minutes)
-        return db.query(SongRequest).filter(
-            SongRequest.user_id == user_id,
-            SongRequest.request_time > thirty_min_ago,
-            SongRequest.status.in_(["pending", "approved", "played"])
-        ).count()
-    
-    def check_song_already_requested(self, db: Session, user_id: int, song_id: str) -> bool:
-        """检查用户是否已经请求过该歌曲"""
-        return db.query(SongRequest).filter(
-            SongRequest.song_id == song_id,
-            SongRequest.status.in_(["pending", "approved"])
-        ).count() > 0
+    def admit_song_request(
+        self, db: Session, user_id: int, song_id: str, song_name: str, is_admin: bool,
+        minutes: int = 30, quota: int = 1, max_active: int = 3
+    ) -> Tuple[Optional[int], Optional[str]]:
+        """
+        原子地检查并创建歌曲请求，一条语句完成
+        返回(新请求ID, 拒绝原因)，拒绝原因为 rate_limited / duplicate / too_many 之一。
+        并发点同一首歌时由部分唯一索引兜底，只有一个请求能插入成功；
+        同一用户的并发点歌（不同歌曲）在READ COMMITTED下都可能通过频率和数量检查，
+        因此非管理员先获取以用户ID为键的事务级咨询锁，同一用户的准入逐个执行。
+        加锁必须是单独的一条语句（多一次往返）：语句的快照在开始执行时确定，
+        若把加锁放进同一条语句的CTE，等到锁之后的检查仍看不到上一个持锁者刚提交的请求。
+        """
+        if not is_admin:
+            db.execute(select(func.pg_advisory_xact_lock(ADMIT_LOCK_NAMESPACE, user_id)))
+        now = datetime.now()
+        checks = [
+            (exists().where(
+                SongRequest.song_id == song_id,
+                SongRequest.status.in_(ACTIVE_STATUSES)
+            ), REJECT_DUPLICATE)
+        ]
+        if not is_admin:
+            recent_count = select(func.count()).where(
+                SongRequest.user_id == user_id,
+                SongRequest.request_time > now - timedelta(minutes=minutes),
+                SongRequest.status.in_(COUNTED_STATUSES)
+            ).scalar_subquery()
+            active_count = select(func.count()).where(
+                SongRequest.user_id == user_id,
+                SongRequest.status.in_(ACTIVE_STATUSES)
+            ).scalar_subquery()
+            checks = [(recent_count >= quota, REJECT_RATE_LIMITED), *checks, (active_count >= max_active, REJECT_TOO_MANY)]
+
+        metadata = song_metadata(song_name, song_detail_cache.get(song_id))
+        verdict = select(case(*checks).label("reason")).cte("verdict")
+        inserted = (
+            insert(SongRequest)
+            .from_select(
+                [
+                    "user_id", "song_id", "song_name", "title", "artist", "duration", "cover",
+                    "status", "request_time", "created_at", "updated_at"
+                ],
+                select(
+                    literal(user_id),
+                    literal(song_id),
+                    literal(song_name),
+                    literal(metadata["title"], String),
+                    literal(metadata["artist"], String),
+                    literal(metadata["duration"], Integer),
+                    literal(metadata["cover"], String),
+                    literal("pending"),
+                    literal(now),
+                    literal(now),
+                    literal(now)
+                ).where(verdict.c.reason.is_(None))
+            )
+            .on_conflict_do_nothing(
+                index_elements=[SongRequest.song_id],
+                index_where=SongRequest.status.in_(ACTIVE_STATUSES)
+            )
+            .returning(SongRequest.id)
+            .cte("inserted")
+        )
+        stmt = select(
+            select(inserted.c.id).scalar_subquery().label("id"),
+            select(verdict.c.reason).scalar_subquery().label("reason")
+        )
+        row = db.execute(stmt).one()
+        db.commit()
+        if row.id is not None:
+            invalidate_song_snapshots()
+            event_broker.publish(EVENT_REQUESTED, {
+                "request_id": row.id,
+                "song_id": song_id,
+                "song_name": song_name,
+                "status": "pending"
+            })
+
+        if row.id is None:
+            # 检查通过但插入被唯一索引拦下：别人刚刚点了同一首歌
+            return None, row.reason or REJECT_DUPLICATE
+        return row.id, None
     
-    def count_pending_approved_songs(self, db: Session, user_id: int) -> int:
-        """计算用户待审核和已批准的歌曲数量"""
-        return db.query(SongRequest).filter(
-            SongRequest.user_id == user_id,
-            SongRequest.status.in_(["pending", "approved"])
-        ).count()
+    def get_requests_missing_metadata(self, db: Session, limit: int) -> List[Tuple[int, str, str]]:
+        """获取尚未回填歌曲详情的请求，返回(请求ID, 歌曲ID, 歌曲名称)"""
+        return [
+            (row.id, row.song_id, row.song_name)
+            for row in db.query(
+                SongRequest.id,
+                SongRequest.song_id,
+                SongRequest.song_name
+            ).filter(
+                SongRequest.duration.is_(None)
+            ).order_by(SongRequest.id.desc()).limit(limit).all()
+        ]
     
-    def create_song_request(self, db: Session, user_id: int, song_id: str,song_name:str) -> SongRequest:
-        """创建歌曲请求"""
-        song_request = SongRequest(
-            user_id=user_id,
-            song_id=song_id,
-            song_name=song_name,
-            status="pending",
-            request_time=datetime.now()
+    def fill_metadata(self, db: Session, metadata: Dict[int, Dict[str, Any]]) -> None:
+        """按请求ID批量写入歌名、歌手、时长和封面"""
+        if not metadata:
+            return
+        db.execute(
+            update(SongRequest).execution_options(synchronize_session=False),
+            [{"id": request_id, **values} for request_id, values in metadata.items()]
         )
-        db.add(song_request)
         db.commit()
-        db.refresh(song_request)
-        return song_request
+        invalidate_song_snapshots()
+    
+    def archive_finished_requests(self, db: Session, before: datetime, limit: int) -> int:
+        """
+        将请求时间早于before的已驳回/已播放请求移入归档表，每次最多limit条，返回移动的条数
+        一条语句完成：DELETE ... RETURNING作为CTE，再INSERT ... SELECT写入归档表；
+        SKIP LOCKED使多个进程同时归档时互不等待。
+        归档表的ID都来自热表的同一序列，且每行移入后即从热表删除，两表ID互不重叠；
+        手工导入等破坏这一前提时插入报错，整条语句（包括删除）回滚，不会丢失数据。
+        """
+        batch = select(SongRequest.id).where(
+            SongRequest.status.in_(FINISHED_STATUSES),
+            SongRequest.request_time < before
+        ).order_by(
+            SongRequest.request_time, SongRequest.id
+        ).limit(limit).with_for_update(skip_locked=True)
+
+        names = [c.name for c in SongRequestArchive.__table__.columns]
+        moved = delete(SongRequest).where(
+            SongRequest.id.in_(batch.scalar_subquery())
+        ).returning(*[SongRequest.__table__.c[name] for name in names]).cte("moved")
+
+        stmt = insert(SongRequestArchive).from_select(
+            names, select(*[moved.c[name] for name in names])
+        ).returning(SongRequestArchive.id)
+
+        archived = len(db.execute(stmt).fetchall())
+        db.commit()
+        if archived:
+            # 热表和归档表各自的计数、按表缓存的列表总数都已变化
+            invalidate_song_snapshots()
+            archive_statistics_cache.clear()
+        return archived
+
+    def get_recent_request_events(self, db: Session, minutes: int) -> List[Tuple[int, int, datetime]]:
+        """获取最近minutes分钟内计入频率限制的请求，返回(user_id, 请求ID, 请求时间)，用于重建限流器"""
+        since = datetime.now() - timedelta(minutes=minutes)
+        return [
+            (row.user_id, row.id, row.request_time)
+            for row in db.query(
+                SongRequest.user_id,
+                SongRequest.id,
+                SongRequest.request_time
+            ).filter(
+                SongRequest.request_time > since,
+                SongRequest.status.in_(COUNTED_STATUSES)
+            ).all()
+        ]
+    
+    def _event_data(self, request: Any) -> Dict[str, Any]:
+        """推送给播放器和管理端的事件内容"""
+        return {
+            "request_id": request.id,
+            "song_id": request.song_id,
+            "song_name": request.song_name,
+            "status": request.status
+        }
     
     def get_song_requests_by_status(self, db: Session, status: str) -> List[Dict[str, Any]]:
         """获取指定状态的歌曲请求列表"""
@@ -94,25 +324,151 @@ class SongRequestRepository(BaseRepository[SongRequest, SongRequestSchema, SongR
         return request.status if request else None# type: ignore
     
     def update_song_request_status(
-        self, db: Session, request_id: int, status: str, reason: str = "", reviewer_id: int|None = None
-    ) -> SongRequest:
-        """更新歌曲请求的状态"""
-        request = db.query(SongRequest).filter(SongRequest.id == request_id).first()
-        if request:
-            request.status = status# type: ignore
-            request.review_time = datetime.now()# type: ignore
-            request.review_reason = reason# type: ignore
-            request.reviewer_id = reviewer_id# type: ignore
-            db.commit()
-            db.refresh(request)
-        return request
+        self, db: Session, request_id: int, status: str, reason: str = "", reviewer_id: int|None = None,
+        expected: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        按状态转换表更新歌曲请求的状态
+        一条 UPDATE ... WHERE status IN (允许的来源状态) RETURNING 语句完成比较并交换；
+        expected不为空时只从该状态转换。请求不存在或当前状态不允许转换时返回None。
+        成功时返回SongRequestResponse所需的字段，点歌用户的姓名和学号由RETURNING中的子查询带出，
+        提交后不再查询数据库。
+        """
+        sources = [source for source, targets in STATUS_TRANSITIONS.items() if status in targets]
+        if expected is not None:
+            sources = [expected] if expected in sources else []
+        if not sources:
+            return None
+
+        now = datetime.now()
+        changes: Dict[str, Any] = {"status": status, "updated_at": now}
+        if status in REVIEW_STATUSES:
+            changes.update(review_time=now, review_reason=reason, reviewer_id=reviewer_id)
+
+        stmt = (
+            update(SongRequest)
+            .where(SongRequest.id == request_id, SongRequest.status.in_(sources))
+            .values(**changes)
+            .returning(
+                SongRequest.id,
+                SongRequest.song_id,
+                SongRequest.song_name,
+                SongRequest.status,
+                SongRequest.request_time,
+                SongRequest.review_time,
+                SongRequest.review_reason,
+                SongRequest.user_id,
+                select(User.name).where(User.id == SongRequest.user_id).scalar_subquery().label("user_name"),
+                select(User.student_id).where(User.id == SongRequest.user_id).scalar_subquery().label("user_student_id")
+            )
+            .execution_options(synchronize_session=False)
+        )
+        request = db.execute(stmt).first()
+        if request is None:
+            db.rollback()
+            return None
+        event_data = self._event_data(request)
+        user_id = request.user_id
+        db.commit()
+
+        invalidate_song_snapshots()
+        # 事件类型即新的状态：approved / rejected / playing / played
+        event_broker.publish(status, event_data)
+        if status == "rejected":
+            # 被驳回的请求不再占用点歌频率额度
+            song_request_limiter.discard(user_id, request_id)
+        return request._asdict()
     
+    def bulk_review(
+        self, db: Session, reviews: List[Tuple[int, str, str]], reviewer_id: int|None = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批量审核歌曲请求，一条语句完成
+        reviews为(请求ID, 审核状态, 审核理由)，只有仍处于pending的请求会被更新。
+        按传入顺序返回每个ID的结果：new_status为审核后的状态（未更新时为None），
+        current_status为审核前的状态（请求不存在时为None）。
+        """
+        now = datetime.now()
+        review = select(
+            values(
+                column("id", Integer),
+                column("status", String),
+                column("reason", Text),
+                name="review_values"
+            ).data(reviews)
+        ).cte("review")
+        updated = (
+            update(SongRequest)
+            .where(SongRequest.id == review.c.id, SongRequest.status == "pending")
+            .values(
+                status=review.c.status,
+                review_reason=review.c.reason,
+                review_time=now,
+                reviewer_id=reviewer_id,
+                updated_at=now
+            )
+            .returning(
+                SongRequest.id,
+                SongRequest.user_id,
+                SongRequest.song_id,
+                SongRequest.song_name,
+                SongRequest.status
+            )
+            .cte("updated")
+        )
+        # 同一语句中读取到的song_requests是更新前的快照
+        stmt = select(
+            review.c.id,
+            updated.c.status.label("new_status"),
+            updated.c.user_id,
+            updated.c.song_id,
+            updated.c.song_name,
+            SongRequest.status.label("current_status")
+        ).select_from(
+            review
+            .outerjoin(updated, updated.c.id == review.c.id)
+            .outerjoin(SongRequest, SongRequest.id == review.c.id)
+        )
+        rows = {row.id: row for row in db.execute(stmt)}
+        db.commit()
+
+        results = []
+        changed = False
+        for request_id, _, _ in reviews:
+            row = rows[request_id]
+            if row.new_status is not None:
+                changed = True
+                event_broker.publish(row.new_status, {
+                    "request_id": row.id,
+                    "song_id": row.song_id,
+                    "song_name": row.song_name,
+                    "status": row.new_status
+                })
+                if row.new_status == "rejected":
+                    song_request_limiter.discard(row.user_id, row.id)
+            results.append({
+                "request_id": request_id,
+                "new_status": row.new_status,
+                "current_status": row.current_status
+            })
+        if changed:
+            invalidate_song_snapshots()
+        return results
+
+    def get_approved_song_queue_snapshot(self, db: Session) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+        """获取已批准歌曲队列的快照，返回(内容版本号, 队列)；快照有效时不访问数据库，调用方不得修改返回的队列"""
+        return queue_snapshot.get(lambda: self.get_approved_song_queue(db))
+
     def get_approved_song_queue(self, db: Session) -> List[Dict[str, Any]]:
         """获取已批准的歌曲队列"""
         query = db.query(
             SongRequest.id,
             SongRequest.song_id,
             SongRequest.song_name,
+            SongRequest.title,
+            SongRequest.artist,
+            SongRequest.duration,
+            SongRequest.cover,
             SongRequest.request_time,
             User.name,
             User.student_id
@@ -124,33 +480,34 @@ class SongRequestRepository(BaseRepository[SongRequest, SongRequestSchema, SongR
             SongRequest.request_time.asc()
         )
         
-        result = []
+        queue = []
         for row in query.all():
-            # 暂时从歌曲名称中尝试提取艺术家信息，或者设为默认值
-            title = str(row.song_name)
-            artist = "未知艺术家"
-            
-            # 如果歌曲名称包含" - "，尝试分离艺术家和歌曲名
-            if " - " in title:
-                parts = title.split(" - ", 1)
-                if len(parts) == 2:
-                    artist = parts[0].strip()
-                    title = parts[1].strip()
-            
-            result.append({
+            title, artist = display_title_artist(row)
+            queue.append({
                 "id": row.id,
                 "request_id": row.id,
                 "song_id": row.song_id,
                 "title": title,
                 "artist": artist,
+                "duration": row.duration,
+                "cover": row.cover,
                 "requester_name": row.name,
                 "created_at": row.request_time.isoformat() if row.request_time else None
             })
-        
-        return result
+        return queue
+    
     def get_requests_by_user_id(self, db: Session, user_id: int,status:List[str]) -> List[SongRequest]:
-        """根据ID获取歌曲请求"""
+        """
+        根据ID获取歌曲请求
+        包含终态时同时读取归档表，已归档的请求排在热表之后
+        """
         fetchall = db.query(SongRequest).filter(SongRequest.user_id == user_id, SongRequest.status.in_(status)).all()
+        archived_statuses = [s for s in status if s in FINISHED_STATUSES]
+        if archived_statuses:
+            fetchall += db.query(SongRequestArchive).filter(
+                SongRequestArchive.user_id == user_id,
+                SongRequestArchive.status.in_(archived_statuses)
+            ).order_by(SongRequestArchive.request_time.desc()).all()
         result = []
         for row in fetchall:
             result.append(SongRequestResponse.model_validate(row))
@@ -158,64 +515,156 @@ class SongRequestRepository(BaseRepository[SongRequest, SongRequestSchema, SongR
 
     def get_current_playing_song(self, db: Session) -> Optional[Dict[str, Any]]:
         """获取当前播放的歌曲"""
+        query = db.query(
+            SongRequest.id,
+            SongRequest.song_id,
+            SongRequest.song_name,
+            SongRequest.title,
+            SongRequest.artist,
+            SongRequest.duration,
+            SongRequest.cover,
+            SongRequest.request_time,
+            SongRequest.status,
+            User.name
+        ).outerjoin(
+            User, User.id == SongRequest.user_id
+        )
+        
         # 查找状态为 "playing" 的歌曲，如果没有则返回队列中第一首
-        current = db.query(SongRequest).join(User).filter(
-            SongRequest.status == "playing"
-        ).first()
+        current = query.filter(SongRequest.status == "playing").first()
         
         if not current:
             # 如果没有正在播放的歌曲，返回队列中第一首已批准的歌曲
-            current = db.query(SongRequest).join(User).filter(
+            current = query.filter(
                 SongRequest.status == "approved"
             ).order_by(SongRequest.request_time.asc()).first()
         
         if current:
-            # 暂时从歌曲名称中尝试提取艺术家信息，或者设为默认值
-            title = str(current.song_name)
-            artist = "未知艺术家"
-            
-            # 如果歌曲名称包含" - "，尝试分离艺术家和歌曲名
-            if " - " in title:
-                parts = title.split(" - ", 1)
-                if len(parts) == 2:
-                    artist = parts[0].strip()
-                    title = parts[1].strip()
-            
+            title, artist = display_title_artist(current)
             return {
                 "id": current.id,
                 "song_id": current.song_id,
                 "title": title,
                 "artist": artist,
-                "requester_name": current.user.name if current.user else "未知用户",
+                "duration": current.duration,
+                "cover": current.cover,
+                "requester_name": current.name or "未知用户",
                 "created_at": current.request_time.isoformat() if current.request_time is not None else None,
                 "status": current.status
             }
         return None
 
     def get_song_statistics(self, db: Session) -> Dict[str, int]:
-        """获取歌曲统计信息"""
-        # 总请求数
-        total_requests = db.query(SongRequest).count()
-        
-        # 今日请求数
-        today = datetime.now().date()
-        today_requests = db.query(SongRequest).filter(
-            func.date(SongRequest.request_time) == today
-        ).count()
-        
-        # 各状态统计
-        pending_count = db.query(SongRequest).filter(SongRequest.status == "pending").count()
-        approved_count = db.query(SongRequest).filter(SongRequest.status == "approved").count()
-        rejected_count = db.query(SongRequest).filter(SongRequest.status == "rejected").count()
-        played_count = db.query(SongRequest).filter(SongRequest.status == "played").count()
-        
+        """
+        获取歌曲统计信息
+        一条聚合查询完成，结果短时间缓存；请求新增或状态变化时缓存失效
+        """
+        cached = statistics_cache.get(STATISTICS_KEY)
+        if cached is not None:
+            return dict(cached)
+
+        # 今日范围使用半开区间，可以利用request_time上的索引
+        today_start = datetime.combine(datetime.now().date(), time.min)
+        tomorrow_start = today_start + timedelta(days=1)
+        row = db.query(
+            func.count().label("total_requests"),
+            func.count().filter(
+                SongRequest.request_time >= today_start,
+                SongRequest.request_time < tomorrow_start
+            ).label("today_requests"),
+            func.count().filter(SongRequest.status == "pending").label("pending_count"),
+            func.count().filter(SongRequest.status == "approved").label("approved_count"),
+            func.count().filter(SongRequest.status == "rejected").label("rejected_count"),
+            func.count().filter(SongRequest.status == "played").label("played_count")
+        ).one()
+
+        statistics = dict(row._mapping)
+        # 归档表中只有已驳回和已播放的请求，且早于今天
+        archived = self._archive_statistics(db)
+        for key, count in archived.items():
+            statistics[key] += count
+        statistics_cache.set(STATISTICS_KEY, statistics)
+        return dict(statistics)
+
+    def _archive_statistics(self, db: Session) -> Dict[str, int]:
+        """归档表的计数，缓存到下一轮归档，避免每次统计都扫描不断增长的归档表"""
+        cached = archive_statistics_cache.get(STATISTICS_KEY)
+        if cached is not None:
+            return cached
+
+        row = db.query(
+            func.count().label("total_requests"),
+            func.count().filter(SongRequestArchive.status == "rejected").label("rejected_count"),
+            func.count().filter(SongRequestArchive.status == "played").label("played_count")
+        ).select_from(SongRequestArchive).one()
+
+        archived = dict(row._mapping)
+        archive_statistics_cache.set(STATISTICS_KEY, archived)
+        return archived
+
+    def _listing_columns(self, model: Any) -> List[Any]:
+        """列表查询的列：与User JOIN后一次取出点歌请求（热表或归档表）和点歌用户的字段，避免逐行访问item.user触发N+1懒加载"""
+        return [
+            model.id,
+            model.song_id,
+            model.song_name,
+            model.status,
+            model.request_time,
+            model.review_time,
+            model.review_reason,
+            model.user_id,
+            User.name.label("user_name"),
+            User.student_id.label("user_student_id")
+        ]
+
+    def _paginate(
+        self,
+        query: Query,
+        total_key: Tuple,
+        page: int,
+        page_size: int,
+        cursor: Optional[str],
+        descending: bool,
+        keys: Tuple[Any, Any] = (SongRequest.request_time, SongRequest.id)
+    ) -> Dict[str, Any]:
+        """
+        按(request_time, id)分页，keys为查询中对应的两列
+        传入cursor时使用键集分页，从游标位置继续读取，耗时与页码无关；
+        否则按page偏移（兼容旧客户端）。多读取一条用于判断是否还有下一页，总数单独缓存。
+        """
+        total = list_total_cache.get(total_key)
+        if total is None:
+            total = query.order_by(None).count()
+            list_total_cache.set(total_key, total)
+
+        request_time, request_id = keys
+        if descending:
+            ordering = (request_time.desc(), request_id.desc())
+        else:
+            ordering = (request_time.asc(), request_id.asc())
+        query = query.order_by(*ordering)
+
+        if cursor:
+            position = tuple_(request_time, request_id)
+            after = tuple_(*decode_cursor(cursor))
+            query = query.filter(position < after if descending else position > after)
+        elif page > 1:
+            query = query.offset((page - 1) * page_size)
+
+        items = query.limit(page_size + 1).all()
+        has_next = len(items) > page_size
+        items = items[:page_size]
+
+        # 投影查询已带出用户字段，逐行转换即可，不会再按行懒加载用户
+        result_items = [dict(item._mapping) for item in items]
+
         return {
-            "total_requests": total_requests,
-            "today_requests": today_requests,
-            "pending_count": pending_count,
-            "approved_count": approved_count,
-            "rejected_count": rejected_count,
-            "played_count": played_count
+            "items": result_items,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "has_next": has_next,
+            "next_cursor": encode_cursor(items[-1].request_time, items[-1].id) if has_next else None
         }
 
     def get_song_history(
@@ -224,100 +673,57 @@ class SongRequestRepository(BaseRepository[SongRequest, SongRequestSchema, SongR
         page: int = 1, 
         page_size: int = 20,
         date: Optional[str] = None,
-        status_filter: Optional[List[str]] = None
+        status_filter: Optional[List[str]] = None,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """获取歌曲历史记录（分页）"""
-        query = db.query(SongRequest).join(User)
-        
-        # 日期筛选
-        if date:
-            target_date = datetime.strptime(date, "%Y-%m-%d").date()
-            query = query.filter(func.date(SongRequest.request_time) == target_date)
-        
-        # 状态筛选
-        if status_filter:
-            query = query.filter(SongRequest.status.in_(status_filter))
-        
-        # 计算总数
-        total = query.count()
-        
-        # 分页查询
-        offset = (page - 1) * page_size
-        items = query.order_by(SongRequest.request_time.desc()).offset(offset).limit(page_size).all()
-        
-        # 转换为响应格式
-        result_items = []
-        for item in items:
-            result_items.append({
-                "id": item.id,
-                "song_id": item.song_id,
-                "song_name": item.song_name,
-                "status": item.status,
-                "request_time": item.request_time,
-                "review_time": item.review_time,
-                "review_reason": item.review_reason,
-                "user_id": item.user_id,
-                "user_name": item.user.name if item.user else None,
-                "user_student_id": item.user.student_id if item.user else None
-            })
-        
-        has_next = (page * page_size) < total
+        """
+        获取歌曲历史记录（分页，最新的在前）
+        同时查询热表和归档表（UNION ALL），筛选条件下推到两个分支，按(request_time, id)归并分页
+        """
+        day_start = datetime.strptime(date, "%Y-%m-%d") if date else None
+
+        def branch(model: Any) -> Any:
+            stmt = select(*self._listing_columns(model)).join(User, model.user_id == User.id)
+            # 日期筛选：使用半开区间，可以利用request_time上的索引
+            if day_start is not None:
+                stmt = stmt.where(
+                    model.request_time >= day_start,
+                    model.request_time < day_start + timedelta(days=1)
+                )
+            # 状态筛选
+            if status_filter:
+                stmt = stmt.where(model.status.in_(status_filter))
+            return stmt
+
+        branches = [branch(SongRequest)]
+        # 归档表只有终态的请求，只筛选活跃状态时不必查询
+        if not status_filter or set(status_filter) & set(FINISHED_STATUSES):
+            branches.append(branch(SongRequestArchive))
+        history = union_all(*branches).subquery("history")
+        query = db.query(history)
         
-        return {
-            "items": result_items,
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "has_next": has_next
-        }
+        total_key = ("history", date, tuple(status_filter or ()))
+        return self._paginate(
+            query, total_key, page, page_size, cursor, descending=True,
+            keys=(history.c.request_time, history.c.id)
+        )
 
     def get_pending_songs_for_review(
         self, 
         db: Session, 
         page: int = 1, 
         page_size: int = 20,
-        status_filter: Optional[List[str]] = None
+        status_filter: Optional[List[str]] = None,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """获取待审核的歌曲列表（分页）"""
-        query = db.query(SongRequest).join(User)
-        
+        """获取待审核的歌曲列表（分页，按请求时间先后）"""
         # 状态筛选 - 默认只显示待审核的
-        if status_filter:
-            query = query.filter(SongRequest.status.in_(status_filter))
-        else:
-            query = query.filter(SongRequest.status == "pending")
-        
-        # 计算总数
-        total = query.count()
-        
-        # 分页查询 - 按请求时间排序，最新的在前
-        offset = (page - 1) * page_size
-        items = query.order_by(SongRequest.request_time.asc()).offset(offset).limit(page_size).all()
-        
-        # 转换为响应格式
-        result_items = []
-        for item in items:
-            result_items.append({
-                "id": item.id,
-                "song_id": item.song_id,
-                "song_name": item.song_name,
-                "status": item.status,
-                "request_time": item.request_time,
-                "review_time": item.review_time,
-                "review_reason": item.review_reason,
-                "user_id": item.user_id,
-                "user_name": item.user.name if item.user else None,
-                "user_student_id": item.user.student_id if item.user else None
-            })
+        status_filter = status_filter or ["pending"]
+        query = db.query(*self._listing_columns(SongRequest)).join(
+            User, SongRequest.user_id == User.id
+        ).filter(SongRequest.status.in_(status_filter))
         
-        has_next = (page * page_size) < total
-        
-        return {
-            "items": result_items,
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "has_next": has_next
-        }
+        total_key = ("review", tuple(status_filter))
+        return self._paginate(query, total_key, page, page_size, cursor, descending=False)
 
 song_request_repository = SongRequestRepository(SongRequest)
\ No newline at end of file
@@ -3,10 +3,18 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import Column, String
 
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.db.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import UserCreate, UserUpdate, UserSnapshot
 from app.db.repositories.base import BaseRepository
 
+# 身份缓存：openid -> 用户快照
+user_identity_cache: TTLCache[UserSnapshot] = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
 class UserRepository(BaseRepository[User, UserCreate, UserUpdate]):
     """用户数据访问层"""
     
@@ -14,6 +22,25 @@ class UserRepository(BaseRepository[User, UserCreate, UserUpdate]):
         """通过微信openid获取用户"""
         return db.query(User).filter(User.wechat_openid == openid).first()
     
+    def get_snapshot_by_openid(self, db: Session, openid: str) -> Optional[UserSnapshot]:
+        """通过微信openid获取用户快照，优先读取身份缓存"""
+        snapshot = user_identity_cache.get(openid)
+        if snapshot is not None:
+            return snapshot
+
+        user = self.get_by_openid(db, openid)
+        if not user:
+            return None
+
+        snapshot = UserSnapshot.model_validate(user)
+        user_identity_cache.set(openid, snapshot)
+        return snapshot
+    
+    def invalidate_identity(self, openid: Optional[str]) -> None:
+        """使指定openid的身份缓存失效"""
+        if openid:
+            user_identity_cache.pop(openid)
+    
     def get_by_student_id_and_name(self, db: Session, student_id: str, name: str) -> Optional[User]:
         """通过学号和姓名获取用户"""
         return db.query(User).filter(
@@ -25,10 +52,21 @@ class UserRepository(BaseRepository[User, UserCreate, UserUpdate]):
         """绑定用户的微信openid"""
         user = db.query(User).filter(User.id == user_id).first()
         if user:
+            previous_openid = user.wechat_openid
             user.wechat_openid = openid  # type: ignore
             user.bind_time = datetime.now()  # type: ignore
             db.commit()
             db.refresh(user)
+            self.invalidate_identity(previous_openid)  # type: ignore
+            self.invalidate_identity(openid)
+        return user
+    
+    def update(self, db: Session, *, db_obj: User, obj_in) -> User:  # type: ignore
+        """更新用户，并使新旧openid的身份缓存失效"""
+        previous_openid = db_obj.wechat_openid
+        user = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self.invalidate_identity(previous_openid)  # type: ignore
+        self.invalidate_identity(user.wechat_openid)  # type: ignore
         return user
 
 # 实例化仓库
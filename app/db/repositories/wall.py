@@ -1,12 +1,22 @@
-from typing import List, Optional
+import re
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_
+from sqlalchemy import Text, desc, and_, case, cast, func
+from sqlalchemy.dialects.postgresql import ARRAY, array
 
-from app.db.models.wall import WallMessage, MessageType, MessageStatus
+from app.core.config import settings
+from app.db.models.wall import CJK_RANGES, SEARCH_SEPARATOR, WallMessage, MessageType, MessageStatus
 from app.db.repositories.base import BaseRepository
 from app.schemas.wall import WallMessageCreate, WallMessageUpdate
 
 
+# pg_trgm按三个字符切分，更短的关键词无法使用三元组索引
+TRIGRAM_MIN_LENGTH = 3
+
+# wall_search_grams只收录汉字，全部由汉字组成的短关键词才能使用单字/双字索引
+CJK_KEYWORD = re.compile(f"[{CJK_RANGES}]+")
+
+
 class WallRepository(BaseRepository[WallMessage, WallMessageCreate, WallMessageUpdate]):
     """校园墙消息仓储类"""
     
@@ -70,6 +80,18 @@ class WallRepository(BaseRepository[WallMessage, WallMessageCreate, WallMessageU
             .all()
         )
     
+    def _keyword_filter(self, keyword: str):
+        """
+        关键词匹配：在search_text上做子串匹配
+        3个字符及以上的关键词使用pg_trgm三元组索引；1~2个汉字的关键词（常见的中文词）
+        使用wall_search_grams(search_text)上的单字/双字GIN索引，包含该字/词即为子串命中。
+        其余1~2个字符的关键词（字母、数字等）没有可用的索引，直接做子串匹配。
+        """
+        keyword = keyword.replace(SEARCH_SEPARATOR, "")
+        if len(keyword) < TRIGRAM_MIN_LENGTH and CJK_KEYWORD.fullmatch(keyword):
+            return func.wall_search_grams(self.model.search_text).op("@>")(cast(array([keyword]), ARRAY(Text)))
+        return self.model.search_text.contains(keyword, autoescape=True)
+    
     def search_messages(
         self,
         db: Session,
@@ -78,24 +100,39 @@ class WallRepository(BaseRepository[WallMessage, WallMessageCreate, WallMessageU
         status: str = "APPROVED",
         skip: int = 0,
         limit: int = 20
-    ) -> List[WallMessage]:
-        """搜索消息"""
-        query = db.query(self.model).filter(self.model.status == status)
+    ) -> Tuple[List[WallMessage], int]:
+        """
+        搜索消息，返回(当前页消息, 总数)
+        按相关度（word_similarity，标题命中加权）和发布时间综合排序；
+        总数由窗口函数count(*) OVER ()随当前页一起返回，不再单独执行一遍筛选。
+        """
+        query = db.query(self.model, func.count().over().label("total")).filter(self.model.status == status)
+        
+        # 添加类型过滤
+        if message_type:
+            query = query.filter(self.model.message_type == message_type)
         
         # 添加关键词搜索
         if keyword:
-            search_filter = or_(
-                self.model.title.contains(keyword),
-                self.model.content.contains(keyword),
-                self.model.tags.contains(keyword)
+            query = query.filter(self._keyword_filter(keyword))
+            relevance = func.word_similarity(keyword, self.model.search_text) + case(
+                (self.model.title.contains(keyword, autoescape=True), 0.5),
+                else_=0
             )
-            query = query.filter(search_filter)
+            # 相关度随发布时间衰减，WALL_SEARCH_RECENCY_DAYS天后减半
+            age_days = func.extract("epoch", func.localtimestamp() - self.model.timestamp) / 86400
+            rank = relevance / (1 + func.greatest(age_days, 0) / settings.WALL_SEARCH_RECENCY_DAYS)
+            query = query.order_by(desc(rank), desc(self.model.timestamp), desc(self.model.id))
+        else:
+            query = query.order_by(desc(self.model.timestamp))
         
-        # 添加类型过滤
-        if message_type:
-            query = query.filter(self.model.message_type == message_type)
+        rows = query.offset(skip).limit(limit).all()
+        if rows:
+            return [row[0] for row in rows], rows[0].total
         
-        return query.order_by(desc(self.model.timestamp)).offset(skip).limit(limit).all()
+        # 页码超出结果范围时窗口函数没有行可返回，单独计数
+        total = self.count_messages(db, message_type=message_type, status=status, keyword=keyword) if skip else 0
+        return [], total
     
     def get_popular_messages(
         self,
@@ -196,12 +233,7 @@ class WallRepository(BaseRepository[WallMessage, WallMessageCreate, WallMessageU
             query = query.filter(self.model.message_type == message_type)
         
         if keyword:
-            search_filter = or_(
-                self.model.title.contains(keyword),
-                self.model.content.contains(keyword),
-                self.model.tags.contains(keyword)
-            )
-            query = query.filter(search_filter)
+            query = query.filter(self._keyword_filter(keyword))
         
         if user_id:
             query = query.filter(self.model.user_id == user_id)
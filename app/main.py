@@ -1,15 +1,48 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import wechat, songs, player, wall,comment,resources
 from app.core.config import settings
+from app.core.querycount import install_query_counter, start_query_count
 from app.db.session import engine
-from app.db.models import User, SongRequest, RefreshToken, WallMessage
+from app.db.models import User, SongRequest, SongRequestArchive, RefreshToken, WallMessage
+from app.services.archive import song_request_archiver
+from app.services.music_api import async_music_api_service
+from app.services.backfill import song_metadata_backfill
+from app.services.events import event_broker
+from app.services.prefetch import queue_prefetcher
+from app.services.ratelimit import rebuild_song_request_limiter
+from app.services.wechat import wechat_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：绑定事件推送、重建点歌限流器、启动播放队列预取、详情回填和请求归档，关闭时释放共享的HTTP连接池"""
+    event_broker.bind(asyncio.get_running_loop())
+    await run_in_threadpool(rebuild_song_request_limiter)
+    if settings.PLAYER_PREFETCH_ENABLED:
+        queue_prefetcher.start()
+    if settings.SONG_BACKFILL_ENABLED:
+        song_metadata_backfill.start()
+    if settings.SONG_ARCHIVE_ENABLED:
+        song_request_archiver.start()
+    yield
+    await queue_prefetcher.stop()
+    await song_metadata_backfill.stop()
+    await song_request_archiver.stop()
+    await wechat_client.aclose()
+    await async_music_api_service.aclose()
+
 
 # 创建FastAPI应用实例
 app = FastAPI(title="校园点歌系统API",
     description="实现了微信小程序端的登录、绑定、搜索、点歌、管理员审核、歌曲播放等全流程",
-    version="1.0.0")
+    version="1.0.0",
+    lifespan=lifespan)
 
 # 配置CORS
 origins = [
@@ -25,6 +58,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 开发模式下统计每个请求执行的SQL条数，通过X-Query-Count响应头暴露，便于发现N+1查询
+if settings.DEVELOP_MODE:
+    install_query_counter(engine)
+
+    @app.middleware("http")
+    async def count_queries(request: Request, call_next):
+        counter = start_query_count()
+        response = await call_next(request)
+        response.headers["X-Query-Count"] = str(counter[0])
+        return response
+
 # 注册路由
 app.include_router(wechat.router, prefix=f"{settings.API_V1_STR}/wechat", tags=["微信小程序"])
 app.include_router(songs.router, prefix=settings.API_V1_STR, tags=["歌曲搜索"])
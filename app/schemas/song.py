@@ -24,6 +24,10 @@ class Song(BaseModel):
 class SearchResponse(BaseModel):
     songs: List[Song]
 
+class SongDetailResponse(BaseModel):
+    songs: List[Song]
+    missing: List[str] = []
+
 class SongRequestResponse(BaseSchema):
     id: int
     song_id: str
@@ -64,6 +68,8 @@ class SongHistoryResponse(BaseSchema):
     page: int
     page_size: int
     has_next: bool
+    # 下一页的游标，没有下一页时为空
+    next_cursor: Optional[str] = None
 
 
 # 歌曲审核相关Schema
@@ -73,10 +79,36 @@ class SongReviewRequest(BaseSchema):
     reason: Optional[str] = Field(None, max_length=500, description="审核理由")
 
 
+class SongBulkReviewItem(SongReviewRequest):
+    """批量审核中的单条审核"""
+    request_id: int = Field(..., description="歌曲请求ID")
+
+
+class SongBulkReviewRequest(BaseSchema):
+    """批量审核请求"""
+    items: List[SongBulkReviewItem] = Field(..., min_length=1, max_length=500, description="审核列表，同一ID只取第一条")
+
+
+class SongBulkReviewResult(BaseSchema):
+    """单条审核结果"""
+    request_id: int
+    success: bool
+    status: Optional[str] = Field(None, description="审核后的状态；请求不存在时为空")
+    detail: Optional[str] = Field(None, description="失败原因")
+
+
+class SongBulkReviewResponse(BaseSchema):
+    """批量审核响应"""
+    updated: int
+    results: List[SongBulkReviewResult]
+
+
 class PendingSongListResponse(BaseSchema):
     """待审核歌曲列表响应"""
     items: List[SongRequestResponse]
     total: int
     page: int
     page_size: int
-    has_next: bool
\ No newline at end of file
+    has_next: bool
+    # 下一页的游标，没有下一页时为空
+    next_cursor: Optional[str] = None
\ No newline at end of file
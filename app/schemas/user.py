@@ -24,4 +24,16 @@ class UserResponse(BaseSchema):
     name: str
     wechat_openid: Optional[str] = None
     bind_time: Optional[datetime] = None
-    is_admin: bool = False
\ No newline at end of file
+    is_admin: bool = False
+
+class UserSnapshot(BaseSchema):
+    """用户的不可变快照，供身份缓存使用"""
+    id: int
+    student_id: str
+    name: str
+    wechat_openid: Optional[str] = None
+    bind_time: Optional[datetime] = None
+    is_admin: bool = False
+
+    class Config:
+        frozen = True
\ No newline at end of file
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.repositories import song_request_repository
+from app.db.session import SessionLocal
+
+
+class SongRequestArchiver:
+    """
+    歌曲请求归档
+
+    在后台分批把请求时间早于after_days天的已驳回/已播放请求移入归档表，
+    使song_requests只保留活跃和近期的请求。迁移前积压的旧数据也由它逐批移走。
+    """
+    def __init__(self, after_days: int, batch_size: int, interval: float):
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """启动后台归档任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台归档任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _archive_batch(self) -> int:
+        db = SessionLocal()
+        try:
+            before = datetime.now() - timedelta(days=self.after_days)
+            return song_request_repository.archive_finished_requests(db, before, self.batch_size)
+        finally:
+            db.close()
+
+    async def archive_once(self) -> int:
+        """归档一批，返回移动的请求数"""
+        return await run_in_threadpool(self._archive_batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                archived = await self.archive_once()
+            except Exception as e:
+                print(f"Error archiving song requests: {e}")
+                archived = 0
+            # 还有积压时立即处理下一批
+            if archived < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+
+song_request_archiver = SongRequestArchiver(
+    after_days=settings.SONG_ARCHIVE_AFTER_DAYS,
+    batch_size=settings.SONG_ARCHIVE_BATCH,
+    interval=settings.SONG_ARCHIVE_INTERVAL
+)
@@ -1,13 +1,13 @@
 import jwt
 import datetime
-import requests
 import uuid
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.db.repositories import refresh_token_repository
+from app.services.wechat import WeChatUnavailable, wechat_client
 
 def create_access_token(openid: str, expiry_hours: int|None = None) -> str:
     """
@@ -26,9 +26,9 @@ def create_access_token(openid: str, expiry_hours: int|None = None) -> str:
         token = token.decode('utf-8')
     return token
 
-def create_refresh_token(openid: str, db: Session, expiry_days: int|None = None) -> str:
+def _encode_refresh_token(openid: str, expiry_days: int|None = None) -> Tuple[str, str, datetime.datetime]:
     """
-    创建长期刷新令牌
+    生成刷新令牌，返回(令牌, 令牌ID, 过期时间)
     """
     if expiry_days is None:
         expiry_days = settings.REFRESH_TOKEN_EXPIRE_DAYS
@@ -46,8 +46,15 @@ def create_refresh_token(openid: str, db: Session, expiry_days: int|None = None)
     token = jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
     if isinstance(token, bytes):
         token = token.decode('utf-8')
+    return token, refresh_token_id, expires_at
+
+def create_refresh_token(openid: str, db: Session, expiry_days: int|None = None) -> str:
+    """
+    创建长期刷新令牌
+    """
+    token, refresh_token_id, expires_at = _encode_refresh_token(openid, expiry_days)
     
-    # 将刷新令牌保存到数据库
+    # 将刷新令牌保存到数据库（按openid upsert，替换旧令牌）
     refresh_token_repository.save_refresh_token(db, openid, refresh_token_id, expires_at)
     
     return token
@@ -79,12 +86,16 @@ def verify_refresh_token(token: str, db: Session) -> Dict[str, Any]:
         openid = payload.get("openid")
         jti = payload.get("jti")
         
-        # 检查令牌是否在数据库中有效
-        if not refresh_token_repository.check_refresh_token_valid(db, openid, jti):
+        # 用新令牌原子地替换旧令牌：旧令牌已失效或已被并发刷新使用时失败
+        refresh_token, refresh_token_id, expires_at = _encode_refresh_token(openid)
+        if not refresh_token_repository.rotate_refresh_token(db, openid, jti, refresh_token_id, expires_at):
             return {"success": False, "msg": "刷新令牌已失效"}
         
-        # 创建新的令牌对
-        tokens = create_token_pair(openid, db)
+        tokens = {
+            "access_token": create_access_token(openid),
+            "refresh_token": refresh_token,
+            "token_type": "bearer"
+        }
         return {"success": True, "tokens": tokens, "openid": openid}
         
     except jwt.ExpiredSignatureError:
@@ -92,23 +103,19 @@ def verify_refresh_token(token: str, db: Session) -> Dict[str, Any]:
     except (jwt.InvalidTokenError, Exception) as e:
         return {"success": False, "msg": f"无效的刷新令牌: {str(e)}"}
 
-def verify_wechat_code(code: str) -> Dict[str, Any]:
+async def verify_wechat_code(code: str) -> Dict[str, Any]:
     """
     验证微信登录码并获取openid
     """
-    wx_url = (
-        "https://api.weixin.qq.com/sns/jscode2session?"
-        f"appid={settings.WECHAT_APPID}&secret={settings.WECHAT_SECRET}"
-        f"&js_code={code}&grant_type=authorization_code"
-    )
-    
     try:
-        resp = requests.get(wx_url)
-        wx_data = resp.json()
+        wx_data = await wechat_client.code2session(code)
         
         if "errcode" in wx_data and wx_data["errcode"] != 0:
             return {"success": False, "msg": f"微信登录失败: {wx_data.get('errmsg')}"}
         
         return {"success": True, "openid": wx_data["openid"]}
+    except WeChatUnavailable:
+        # code可能已被微信消耗，不能在服务端重试
+        return {"success": False, "retryable": True, "msg": "微信服务响应超时，请重新登录"}
     except Exception as e:
         return {"success": False, "msg": f"微信登录请求失败: {str(e)}"}
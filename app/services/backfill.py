@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.repositories import song_request_repository
+from app.db.repositories.song_request import song_metadata
+from app.db.session import SessionLocal
+from app.services.music_api import DETAIL_BATCH_SIZE, async_music_api_service
+
+
+class SongMetadataBackfill:
+    """
+    歌曲请求详情回填
+
+    在后台分批查找尚未写入时长的歌曲请求（写入时详情未缓存的新请求，以及迁移前的旧数据），
+    批量获取歌曲详情并写回歌名、歌手、时长和封面。上游查不到的歌曲按歌曲名称解析，时长记为0。
+    """
+    def __init__(self, batch_size: int, interval: float):
+        self.batch_size = min(batch_size, DETAIL_BATCH_SIZE)
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """启动后台回填任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台回填任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _load_batch(self) -> List[Tuple[int, str, str]]:
+        db = SessionLocal()
+        try:
+            return song_request_repository.get_requests_missing_metadata(db, self.batch_size)
+        finally:
+            db.close()
+
+    def _save(self, metadata: Dict[int, Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            song_request_repository.fill_metadata(db, metadata)
+        finally:
+            db.close()
+
+    async def backfill_once(self) -> int:
+        """回填一批，返回处理的请求数"""
+        rows = await run_in_threadpool(self._load_batch)
+        if not rows:
+            return 0
+
+        details = await async_music_api_service.get_song_details([song_id for _, song_id, _ in rows])
+        metadata = {}
+        for request_id, song_id, song_name in rows:
+            values = song_metadata(song_name, details.get(song_id))
+            if values["duration"] is None:
+                values.update(duration=0, cover="")
+            metadata[request_id] = values
+
+        await run_in_threadpool(self._save, metadata)
+        return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.backfill_once()
+            except Exception as e:
+                print(f"Error backfilling song metadata: {e}")
+                processed = 0
+            # 还有积压时立即处理下一批
+            if processed < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+
+song_metadata_backfill = SongMetadataBackfill(
+    batch_size=settings.SONG_BACKFILL_BATCH,
+    interval=settings.SONG_BACKFILL_INTERVAL
+)
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+# 事件类型
+EVENT_REQUESTED = "requested"
+EVENT_APPROVED = "approved"
+EVENT_REJECTED = "rejected"
+EVENT_PLAYING = "playing"
+EVENT_PLAYED = "played"
+# 订阅者落后太多或无法续传时发送，客户端应重新获取 /player/queue
+EVENT_RESET = "reset"
+
+# 建议客户端断线后的重连间隔（毫秒）
+RETRY_MS = 3000
+
+
+class Subscriber:
+    """单个SSE连接的事件队列"""
+    def __init__(self, maxsize: int):
+        self.queue: "asyncio.Queue[Optional[Tuple[int, str]]]" = asyncio.Queue(maxsize=maxsize)
+
+
+class EventBroker:
+    """
+    进程内的事件广播
+
+    事件在事件循环线程中分发给所有订阅者，并保存在环形缓冲区中，
+    断线重连时可以根据Last-Event-ID补发错过的事件。
+    同步代码（线程池中的接口、仓库）通过publish线程安全地发布事件。
+    事件ID带有进程纪元前缀，进程重启或重连到其他进程（多worker部署）时旧的ID会触发reset。
+    """
+    def __init__(self, buffer_size: int, queue_size: int, heartbeat: float):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        # (序号, 格式化后的SSE消息)
+        self._buffer: Deque[Tuple[int, str]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """绑定分发事件的事件循环（在应用启动时调用）"""
+        self._loop = loop
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        """发布事件，可在任意线程中调用；未绑定事件循环时丢弃"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(event, data)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, event, data)
+
+    def _format(self, seq: int, event: str, data: Dict[str, Any]) -> str:
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        return f"id: {self._epoch}-{seq}\nevent: {event}\ndata: {payload}\n\n"
+
+    def _dispatch(self, event: str, data: Dict[str, Any]) -> None:
+        self._seq += 1
+        item = (self._seq, self._format(self._seq, event, data))
+        self._buffer.append(item)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # 订阅者处理太慢：丢弃积压的事件，通知其重新同步
+                self._subscribers.discard(subscriber)
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(None)
+
+    def _missed_events(self, last_event_id: Optional[str]) -> Optional[List[Tuple[int, str]]]:
+        """last_event_id之后的缓冲事件；无法续传时返回None"""
+        epoch, _, seq = (last_event_id or "").partition("-")
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self._seq or (self._buffer and seq < self._buffer[0][0] - 1):
+            return None
+        return [item for item in self._buffer if item[0] > seq]
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        生成SSE消息流：先补发错过的事件，之后推送实时事件，空闲时发送心跳
+        注册订阅者后立即（第一次yield之前）读取缓冲区，中间没有await，不会漏掉事件；
+        队列中序号不大于已补发事件的消息会被跳过，不会重复推送。
+        缓冲区只在本进程内，续传只在单进程（单worker）部署时可靠：
+        重连到其他进程时纪元不同，只能收到reset。
+        """
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        missed: Optional[List[Tuple[int, str]]] = []
+        if last_event_id:
+            missed = self._missed_events(last_event_id)
+        replayed_seq = missed[-1][0] if missed else 0
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            if missed is None:
+                yield self._format(self._seq, EVENT_RESET, {})
+            else:
+                for _, message in missed:
+                    yield message
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if item is None:
+                    yield self._format(self._seq, EVENT_RESET, {})
+                    return
+                if item[0] <= replayed_seq:
+                    continue
+                yield item[1]
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscribers": len(self._subscribers), "last_event": self._seq}
+
+
+event_broker = EventBroker(
+    buffer_size=settings.PLAYER_EVENTS_BUFFER,
+    queue_size=settings.PLAYER_EVENTS_QUEUE_SIZE,
+    heartbeat=settings.PLAYER_EVENTS_HEARTBEAT
+)
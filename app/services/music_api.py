@@ -1,95 +1,291 @@
-import requests
-from typing import List, Dict, Any
+import asyncio
+import unicodedata
+import httpx
+from typing import Awaitable, Callable, Hashable, List, Dict, Any, Optional, Set, Tuple
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.resilience import AsyncSingleFlight, CircuitBreaker, CircuitBreakerOpen
 from app.schemas.song import Song
 
-class MusicAPIService:
+# 搜索结果缓存：(规范化关键词, 页码) -> 歌曲列表
+search_cache: TTLCache[List[Song]] = TTLCache(
+    maxsize=settings.MUSIC_SEARCH_CACHE_SIZE,
+    ttl=settings.MUSIC_SEARCH_CACHE_TTL,
+    stale_ttl=settings.MUSIC_SEARCH_CACHE_STALE_TTL
+)
+
+# 播放地址缓存：(歌曲ID, 码率) -> 接口响应，在上游链接过期前淘汰
+song_url_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    maxsize=settings.MUSIC_URL_CACHE_SIZE,
+    ttl=settings.MUSIC_URL_DEFAULT_EXPIRY
+)
+
+# 歌曲详情缓存：歌曲ID -> 详情（元数据基本不变，可以长时间缓存）
+song_detail_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    maxsize=settings.MUSIC_DETAIL_CACHE_SIZE,
+    ttl=settings.MUSIC_DETAIL_CACHE_TTL
+)
+
+# 单次上游 /song/detail 请求最多携带的歌曲ID数
+DETAIL_BATCH_SIZE = 100
+
+# 上游熔断器：上游无响应时快速失败，由缓存（含陈旧数据）兜底
+music_api_breaker = CircuitBreaker(
+    failure_threshold=settings.MUSIC_API_BREAKER_THRESHOLD,
+    reset_timeout=settings.MUSIC_API_BREAKER_RESET
+)
+
+def cache_song_url(key: Hashable, result: Dict[str, Any], expires_in: float) -> None:
+    """
+    按上游链接的有效期缓存播放地址
+    在过期前MUSIC_URL_EXPIRY_MARGIN秒淘汰；最后MUSIC_URL_REFRESH_AHEAD秒内命中时触发后台刷新
+    """
+    usable = expires_in - settings.MUSIC_URL_EXPIRY_MARGIN
+    if usable <= 0:
+        return
+    refresh_ahead = min(settings.MUSIC_URL_REFRESH_AHEAD, usable / 2)
+    song_url_cache.set(key, result, ttl=usable - refresh_ahead, stale_ttl=refresh_ahead)
+
+def parse_search_songs(data: Any) -> List[Song]:
+    """将上游 /search 的响应转换为歌曲列表"""
+    if not data:
+        return []
+    data_result_songs = (data.get("result") or {}).get("songs") or []
+    songs = []
+    for item in data_result_songs:
+        artists = item.get("artists", [])
+        artists = [artist.get("name", "") for artist in artists]
+
+        song = Song(
+            id=str(item.get("id", "")),
+            name=item.get("name", ""),
+            artists=artists,
+            album=item.get("album").get("name", ""),
+        )
+        songs.append(song)
+    return songs
+
+def parse_song_url(data: Any) -> Tuple[Dict[str, Any], float]:
+    """将上游 /song/url 的响应转换为(接口响应, 上游有效期秒数)"""
+    data_data = data.get("data")[0] if data and "data" in data else {}
+    result = {
+        "code": 200 if data and "url" in data else 404,
+        "data": {
+            "url": data_data.get("url", ""),
+            "br": data_data.get("br", 0),
+            "size": data_data.get("size", 0)
+        }
+    }
+    return result, data_data.get("expi") or settings.MUSIC_URL_DEFAULT_EXPIRY
+
+def parse_song_detail(song_info: Dict[str, Any]) -> Dict[str, Any]:
+    """将上游 /song/detail 返回的单首歌曲转换为详情字典"""
+    artists = song_info.get("ar", [])
+    artist_names = [artist.get("name", "") for artist in artists]
+
+    return {
+        "id": str(song_info.get("id", "")),
+        "name": song_info.get("name", ""),
+        "artists": artist_names,
+        "album": song_info.get("al", {}).get("name", ""),
+        "duration": song_info.get("dt", 0),
+        "cover": song_info.get("al", {}).get("picUrl", "")
+    }
+
+def parse_song_details(data: Any) -> Dict[str, Dict[str, Any]]:
+    """将上游 /song/detail 的响应转换为 歌曲ID -> 详情"""
+    if not data or not data.get("songs"):
+        return {}
+    return {detail["id"]: detail for detail in map(parse_song_detail, data["songs"])}
+
+def normalize_query(query: str) -> str:
+    """规范化搜索关键词：全角转半角、去掉空白、转小写"""
+    return "".join(unicodedata.normalize("NFKC", query).split()).lower()
+
+def flight_key(path: str, params: Dict[str, Any]) -> Hashable:
+    """完全相同的上游请求使用同一个请求合并key"""
+    return path, tuple(sorted(params.items()))
+
+def search_params(query: str, page: int, limit: int) -> Dict[str, Any]:
+    """上游 /search 的请求参数"""
+    return {
+        "keywords": query,
+        "limit": limit,
+        "offset": (page-1)*limit
+    }
+
+def _split_cached_details(song_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """将歌曲ID去重并分为(已缓存的详情, 未缓存的ID)"""
+    details: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for song_id in dict.fromkeys(song_ids):
+        detail = song_detail_cache.get(song_id)
+        if detail is not None:
+            details[song_id] = detail
+        else:
+            missing.append(song_id)
+    return details, missing
+
+def _cache_details(details: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """写入歌曲详情缓存"""
+    for song_id, detail in details.items():
+        song_detail_cache.set(song_id, detail)
+    return details
+
+class AsyncMusicAPIService:
+    """
+    异步音乐服务
+
+    所有请求复用同一个httpx连接池（由应用生命周期关闭），带有单次请求超时和连接数上限。
+    """
     def __init__(self):
         self.base_url = settings.MUSIC_API_BASE_URL
         self.limit = settings.DEFAULT_LIMIT
-    
-    def search_songs(self, query: str, source: str|None = "netease", count: int = 30, page: int = 1) -> List[Song]:
+        self._client: Optional[httpx.AsyncClient] = None
+        self._refreshing: Set[Hashable] = set()
+        # 持有后台任务的引用，防止被垃圾回收
+        self._background: Set[asyncio.Task] = set()
+        self._inflight = AsyncSingleFlight()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """惰性创建共享的连接池"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(
+                    settings.MUSIC_API_TIMEOUT,
+                    connect=settings.MUSIC_API_CONNECT_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.MUSIC_API_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.MUSIC_API_MAX_KEEPALIVE
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """取消后台刷新任务并关闭连接池"""
+        for task in list(self._background):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request_json(self, path: str, params: Dict[str, Any]) -> Any:
+        """请求上游接口并解析JSON，并发的相同请求共享同一个上游请求"""
+        return await self._inflight.do(flight_key(path, params), lambda: self._fetch_json(path, params))
+
+    async def _fetch_json(self, path: str, params: Dict[str, Any]) -> Any:
+        """经过熔断器请求上游接口"""
+        if not music_api_breaker.allow():
+            raise CircuitBreakerOpen(f"音乐服务暂不可用: {path}")
+        try:
+            response = await self.client.get(path, params=params)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            data = response.json()
+        except Exception:
+            music_api_breaker.record_failure()
+            raise
+        music_api_breaker.record_success()
+        return data
+
+    def _revalidate(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> None:
+        """在后台重新加载陈旧的缓存条目，同一个key同时只刷新一次"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def task():
+            try:
+                await load()
+            finally:
+                self._refreshing.discard(key)
+
+        background = asyncio.create_task(task())
+        self._background.add(background)
+        background.add_done_callback(self._background.discard)
+
+    async def search_songs(self, query: str, source: str|None = "netease", count: int = 30, page: int = 1) -> List[Song]:
         # 去掉空格
         query = query.replace(" ", "")
-        params = {
-            "keywords": query,
-            "limit": self.limit,
-            "offset": (page-1)*self.limit
-        }
-        
+        key = (normalize_query(query), page)
+
+        # 命中缓存直接返回；陈旧数据先返回，再在后台刷新
+        cached = search_cache.lookup(key)
+        if cached is not None:
+            songs, stale = cached
+            if stale:
+                self._revalidate(("search", key), lambda: self._load_search(query, page, key))
+            return list(songs)
+
+        songs = await self._load_search(query, page, key)
+        return list(songs) if songs is not None else []
+
+    async def _load_search(self, query: str, page: int, key: Hashable) -> Optional[List[Song]]:
+        """请求上游搜索并写入缓存，失败时返回None"""
         try:
-            response = requests.get(self.base_url+"/search", params=params)
-            data = response.json()
-            
-            if not data:
-                return []
-            data_result_songs = data.get("result").get("songs")
-            songs = []
-            for item in data_result_songs:
-                artists = item.get("artists", [])
-                artists = [artist.get("name", "") for artist in artists]
-                
-                song = Song(
-                    id=str(item.get("id", "")),
-                    name=item.get("name", ""),
-                    artists=artists,
-                    album=item.get("album").get("name", ""),
-                )
-                songs.append(song)
-            
-            return songs
+            songs = parse_search_songs(await self._request_json("/search", search_params(query, page, self.limit)))
         except Exception as e:
             print(f"Error searching songs: {e}")
-            return []
-    
-    def get_song_url(self, song_id: str, source: str|None = "netease", bitrate: str|None = None) -> Dict[str, Any]:
-        params = {
-            "id": song_id,
-            "br": bitrate
-        }
-        
+            return None
+        search_cache.set(key, songs)
+        return songs
+
+    async def get_song_url(self, song_id: str, source: str|None = "netease", bitrate: str|None = None) -> Dict[str, Any]:
+        key = (song_id, bitrate)
+
+        # 临近上游过期的条目仍然返回，同时在后台提前刷新
+        cached = song_url_cache.lookup(key)
+        if cached is not None:
+            result, refresh_due = cached
+            if refresh_due:
+                self._revalidate(("url", key), lambda: self._load_song_url(song_id, bitrate, key))
+            return result
+
+        return await self._load_song_url(song_id, bitrate, key)
+
+    async def _load_song_url(self, song_id: str, bitrate: str|None, key: Hashable) -> Dict[str, Any]:
+        """请求上游播放地址，按上游给出的有效期写入缓存"""
+        # httpx会把值为None的参数编码为空字符串，因此不传未指定的码率
+        params = {"id": song_id}
+        if bitrate is not None:
+            params["br"] = bitrate
         try:
-            response = requests.get(self.base_url+"/song/url", params=params)
-            data = response.json()
-            data_data = data.get("data")[0] if data and "data" in data else {}
-            return {
-                "code": 200 if data and "url" in data else 404,
-                "data": {
-                    "url": data_data.get("url", ""),
-                    "br": data_data.get("br", 0),
-                    "size": data_data.get("size", 0)
-                }
-            }
+            result, expires_in = parse_song_url(await self._request_json("/song/url", params))
         except Exception as e:
             print(f"Error getting song URL: {e}")
             return {"code": 500, "data": {}}
-    
-    def get_song_detail(self, song_id: str) -> Dict[str, Any]:
+        if result["data"].get("url"):
+            cache_song_url(key, result, expires_in)
+        return result
+
+    async def get_song_detail(self, song_id: str) -> Dict[str, Any]:
         """根据歌曲ID获取歌曲详细信息"""
         try:
-            response = requests.get(f"{self.base_url}/song/detail", params={"ids": song_id})
-            data = response.json()
-            
-            if not data or "songs" not in data or not data["songs"]:
-                return {"code": 404, "data": {}}
-            
-            song_info = data["songs"][0]
-            artists = song_info.get("ar", [])
-            artist_names = [artist.get("name", "") for artist in artists]
-            
-            return {
-                "code": 200,
-                "data": {
-                    "id": str(song_info.get("id", "")),
-                    "name": song_info.get("name", ""),
-                    "artists": artist_names,
-                    "album": song_info.get("al", {}).get("name", ""),
-                    "duration": song_info.get("dt", 0),
-                    "cover": song_info.get("al", {}).get("picUrl", "")
-                }
-            }
+            details = await self.get_song_details([song_id])
         except Exception as e:
             print(f"Error getting song detail: {e}")
             return {"code": 500, "data": {}}
 
-music_api_service = MusicAPIService()
\ No newline at end of file
+        if song_id not in details:
+            return {"code": 404, "data": {}}
+        return {"code": 200, "data": details[song_id]}
+
+    async def get_song_details(self, song_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取歌曲详细信息，返回 歌曲ID -> 详情
+        已缓存的歌曲直接返回，其余的按批并发请求上游
+        """
+        details, missing = _split_cached_details(song_ids)
+        batches = [missing[start:start + DETAIL_BATCH_SIZE] for start in range(0, len(missing), DETAIL_BATCH_SIZE)]
+        responses = await asyncio.gather(*(
+            self._request_json("/song/detail", {"ids": ",".join(batch)}) for batch in batches
+        ))
+        for data in responses:
+            details.update(_cache_details(parse_song_details(data)))
+        return details
+
+
+async_music_api_service = AsyncMusicAPIService()
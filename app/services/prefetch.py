@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.repositories import song_request_repository
+from app.db.session import SessionLocal
+from app.services.music_api import async_music_api_service, song_detail_cache, song_url_cache
+
+
+def cached_song_media(song_id: str) -> Optional[Dict[str, Any]]:
+    """
+    只从缓存中读取歌曲的播放地址和详情，不请求上游
+    使用peek读取，不影响缓存的命中统计和淘汰顺序；播放地址尚未解析时返回None
+    """
+    cached = song_url_cache.peek((song_id, None))
+    if cached is None:
+        return None
+    detail = song_detail_cache.peek(song_id)
+    return {
+        **cached[0]["data"],
+        "detail": detail[0] if detail is not None and not detail[1] else None
+    }
+
+
+class QueuePrefetcher:
+    """
+    播放队列预取器
+
+    定期读取已批准的歌曲队列，为队首的若干首歌预先解析播放地址和详情，
+    播放器切歌时直接使用队列中返回的地址，无需等待上游。
+    临近过期的播放地址由缓存的提前刷新机制在后台更新。
+    """
+    def __init__(self, count: int, interval: float):
+        self.count = count
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """启动后台预取任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台预取任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _head_song_ids(self) -> List[str]:
+        """读取队首的歌曲ID"""
+        db = SessionLocal()
+        try:
+            _, queue = song_request_repository.get_approved_song_queue_snapshot(db)
+        finally:
+            db.close()
+        return [str(song["song_id"]) for song in queue[:self.count]]
+
+    async def prefetch(self, song_ids: List[str]) -> None:
+        """预先解析歌曲详情和播放地址"""
+        if not song_ids:
+            return
+        try:
+            await async_music_api_service.get_song_details(song_ids)
+        except Exception as e:
+            print(f"Error prefetching song details: {e}")
+        await asyncio.gather(*(async_music_api_service.get_song_url(song_id) for song_id in song_ids))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                song_ids = await run_in_threadpool(self._head_song_ids)
+                await self.prefetch(song_ids)
+            except Exception as e:
+                print(f"Error prefetching player queue: {e}")
+            await asyncio.sleep(self.interval)
+
+
+queue_prefetcher = QueuePrefetcher(
+    count=settings.PLAYER_PREFETCH_COUNT,
+    interval=settings.PLAYER_PREFETCH_INTERVAL
+)
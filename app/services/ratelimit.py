@@ -0,0 +1,23 @@
+from app.core.config import settings
+from app.core.ratelimit import song_request_limiter
+from app.db.repositories import song_request_repository
+from app.db.session import SessionLocal
+
+
+def rebuild_song_request_limiter() -> None:
+    """
+    从song_requests表重建点歌限流器
+    数据库不可用时保持为空，此时频率限制仍由点歌语句中的检查兜底
+    """
+    db = SessionLocal()
+    try:
+        events = song_request_repository.get_recent_request_events(db, settings.SONG_REQUEST_WINDOW_MINUTES)
+    except Exception as e:
+        print(f"Error rebuilding song request limiter: {e}")
+        return
+    finally:
+        db.close()
+
+    song_request_limiter.reset(
+        (user_id, request_id, request_time.timestamp()) for user_id, request_id, request_time in events
+    )
@@ -0,0 +1,96 @@
+import asyncio
+import random
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+# 微信返回的可重试错误码：-1 表示系统繁忙
+RETRYABLE_ERRCODES = {-1}
+
+# 请求确定没有发到微信的网络错误，可以用同一个code重试
+RETRYABLE_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class WeChatUnavailable(Exception):
+    """请求已发出但没有拿到结果（读超时、连接中断等），code可能已被消耗，需要客户端重新获取code后重试"""
+
+
+class WeChatClient:
+    """
+    微信开放接口的异步客户端
+
+    复用长连接池，设置连接/读取超时，限制并发请求数。
+    js_code只能使用一次，因此只在请求确定没有到达微信（连接失败/连接超时）或微信返回系统繁忙时
+    进行带随机抖动的指数退避重试；请求发出后的读超时等错误抛出WeChatUnavailable，由客户端换新code重试。
+    """
+    def __init__(self):
+        self.base_url = settings.WECHAT_API_BASE_URL
+        self.max_retries = settings.WECHAT_MAX_RETRIES
+        self.backoff_base = 0.2
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(settings.WECHAT_MAX_CONCURRENCY)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """惰性创建共享的连接池"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(
+                    settings.WECHAT_READ_TIMEOUT,
+                    connect=settings.WECHAT_CONNECT_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.WECHAT_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.WECHAT_MAX_CONNECTIONS
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _backoff(self, attempt: int) -> None:
+        """指数退避 + 全抖动"""
+        await asyncio.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+
+    async def code2session(self, code: str) -> Dict[str, Any]:
+        """调用jscode2session，返回微信的原始响应数据"""
+        params = {
+            "appid": settings.WECHAT_APPID,
+            "secret": settings.WECHAT_SECRET,
+            "js_code": code,
+            "grant_type": "authorization_code",
+        }
+
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                try:
+                    resp = await self.client.get("/sns/jscode2session", params=params)
+                except RETRYABLE_TRANSPORT_ERRORS:
+                    if last_attempt:
+                        raise
+                    await self._backoff(attempt)
+                    continue
+                except httpx.TransportError as e:
+                    raise WeChatUnavailable(str(e)) from e
+
+                resp.raise_for_status()
+
+                data = resp.json()
+                if data.get("errcode") in RETRYABLE_ERRCODES and not last_attempt:
+                    await self._backoff(attempt)
+                    continue
+                return data
+
+        # 循环总会在最后一次尝试时返回或抛出异常
+        raise RuntimeError("unreachable")
+
+
+wechat_client = WeChatClient()
@@ -0,0 +1,63 @@
+"""
+认证开销微基准
+
+对比 get_openid 在以下几种情况下的单次耗时：
+- legacy: 旧实现，每次请求都 jwt.decode 并创建一个数据库会话依赖
+- cold:   新实现但缓存未命中（每次调用前清空令牌缓存）
+- warm:   新实现且缓存命中
+
+用法:
+    python -m benchmarks.bench_auth
+    python -m benchmarks.bench_auth --iterations 200000
+"""
+import argparse
+import timeit
+
+import jwt
+
+from app.core.config import settings
+from app.core.security import access_token_cache, get_openid
+from app.db.session import get_db
+from app.services.auth import create_access_token
+
+
+def legacy_get_openid(authorization: str) -> str:
+    """旧版get_openid：每次解码令牌，并声明一个不会使用的数据库会话"""
+    db_gen = get_db()
+    next(db_gen)
+    try:
+        token = authorization.split(" ")[1]
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+        if payload.get("type") == "refresh":
+            raise ValueError("无效的令牌类型")
+        return payload["openid"]
+    finally:
+        db_gen.close()
+
+
+def cold_get_openid(authorization: str) -> str:
+    access_token_cache.clear()
+    return get_openid(authorization)
+
+
+def run(label: str, func, authorization: str, iterations: int) -> float:
+    timer = timeit.Timer(lambda: func(authorization))
+    # 取多轮中的最好成绩，减少噪声
+    best = min(timer.repeat(repeat=5, number=iterations)) / iterations
+    print(f"{label:<8} {best * 1e6:8.2f} µs/次")
+    return best
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="认证开销微基准")
+    argparser.add_argument("--iterations", type=int, default=50000, help="每轮调用次数")
+    args = argparser.parse_args()
+
+    authorization = f"Bearer {create_access_token('bench-openid')}"
+    print(f"每轮 {args.iterations} 次调用，取5轮最好成绩")
+
+    legacy = run("legacy", legacy_get_openid, authorization, args.iterations)
+    cold = run("cold", cold_get_openid, authorization, args.iterations)
+    warm = run("warm", get_openid, authorization, args.iterations)
+
+    print(f"缓存命中相对旧实现加速: {legacy / warm:.1f}x")
@@ -0,0 +1,70 @@
+"""
+微信登录并发压测
+
+两种模式：
+- client: 进程内直接并发调用 verify_wechat_code，自动启动本地微信替身，无需数据库
+- http:   对已启动的服务发起 /api/wechat/login 请求（服务需以
+          WECHAT_API_BASE_URL 指向微信替身启动，并连接数据库）
+
+用法:
+    python -m benchmarks.bench_login --mode client --requests 2000 --concurrency 200
+    python -m benchmarks.bench_login --mode http --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import os
+
+import httpx
+
+from benchmarks.common import drive, report, serve_in_thread
+
+
+async def run_client_mode(args) -> None:
+    from benchmarks.stub_wechat import create_app
+    server = serve_in_thread(create_app(args.latency_ms, args.jitter_ms, args.error_rate), "127.0.0.1", args.stub_port)
+
+    # 必须在微信替身启动、环境变量设置后再导入应用模块
+    from app.services.auth import verify_wechat_code
+    from app.services.wechat import wechat_client
+
+    async def call(i: int) -> bool:
+        result = await verify_wechat_code(f"code-{i}")
+        return result["success"]
+
+    latencies, errors, elapsed = await drive(call, args.requests, args.concurrency)
+    report("login", latencies, elapsed, errors)
+    await wechat_client.aclose()
+    server.should_exit = True
+
+
+async def run_http_mode(args) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        async def call(i: int) -> bool:
+            try:
+                resp = await client.post("/api/wechat/login", json={"code": f"code-{i}"})
+                return resp.status_code == 200
+            except httpx.HTTPError:
+                return False
+
+        latencies, errors, elapsed = await drive(call, args.requests, args.concurrency)
+    report("login", latencies, elapsed, errors)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="微信登录并发压测")
+    argparser.add_argument("--mode", choices=["client", "http"], default="client")
+    argparser.add_argument("--url", default="http://127.0.0.1:8000", help="http模式下的服务地址")
+    argparser.add_argument("--requests", type=int, default=1000, help="总请求数")
+    argparser.add_argument("--concurrency", type=int, default=100, help="并发数")
+    argparser.add_argument("--stub-port", type=int, default=9100, help="client模式下微信替身端口")
+    argparser.add_argument("--latency-ms", type=float, default=80)
+    argparser.add_argument("--jitter-ms", type=float, default=40)
+    argparser.add_argument("--error-rate", type=float, default=0.0)
+    args = argparser.parse_args()
+
+    if args.mode == "client":
+        os.environ["WECHAT_API_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}"
+        asyncio.run(run_client_mode(args))
+    else:
+        asyncio.run(run_http_mode(args))
@@ -0,0 +1,125 @@
+"""
+音乐接口压测：/api/search、/api/geturl、/api/songs/detail
+
+两种模式：
+- app:  自动启动本地音乐接口替身，在进程内通过ASGI直接驱动FastAPI应用（含生命周期），无需数据库
+- http: 对已启动的服务发起请求（服务需以 MUSIC_API_BASE_URL 指向音乐接口替身或真实上游）
+
+每个场景开始前清空音乐缓存（--keep-cache 可保留），请求在 --keys 个不同的关键词/歌曲ID
+之间循环，keys 越小缓存命中率越高。
+
+用法:
+    python -m benchmarks.bench_music --mode app --requests 2000 --concurrency 100 --keys 50
+    python -m benchmarks.bench_music --mode app --scenarios search --error-rate 0.2
+    python -m benchmarks.bench_music --mode app --scenarios geturl --hang-rate 0.1 --hang-seconds 10
+    python -m benchmarks.bench_music --mode http --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict
+
+import httpx
+
+from benchmarks.common import drive, report, serve_in_thread
+
+SCENARIOS = ("search", "geturl", "detail")
+
+
+def build_calls(client: httpx.AsyncClient, keys: int, detail_batch: int) -> Dict[str, Callable[[int], Awaitable[bool]]]:
+    """构造各场景的单次请求函数"""
+    async def search(i: int) -> bool:
+        resp = await client.get("/api/search", params={"query": f"song {i % keys}"})
+        return resp.status_code == 200
+
+    async def geturl(i: int) -> bool:
+        resp = await client.get("/api/geturl", params={"id": str(100000 + i % keys)})
+        return resp.status_code == 200 and resp.json().get("code") != 500
+
+    async def detail(i: int) -> bool:
+        first = (i * detail_batch) % max(keys, detail_batch)
+        ids = ",".join(str(100000 + (first + j) % max(keys, detail_batch)) for j in range(detail_batch))
+        resp = await client.get("/api/songs/detail", params={"ids": ids})
+        return resp.status_code == 200
+
+    return {"search": search, "geturl": geturl, "detail": detail}
+
+
+async def run_scenarios(client: httpx.AsyncClient, args, clear_caches: Callable[[], None]) -> None:
+    calls = build_calls(client, args.keys, args.detail_batch)
+    for name in args.scenarios:
+        if not args.keep_cache:
+            clear_caches()
+
+        async def call(i: int, fn=calls[name]) -> bool:
+            try:
+                return await fn(i)
+            except httpx.HTTPError:
+                return False
+
+        latencies, errors, elapsed = await drive(call, args.requests, args.concurrency)
+        report(name, latencies, elapsed, errors)
+
+
+async def run_app_mode(args) -> None:
+    from benchmarks.fake_music_api import create_app
+    server = serve_in_thread(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.hang_rate, args.hang_seconds),
+        "127.0.0.1",
+        args.stub_port
+    )
+
+    # 必须在音乐替身启动、环境变量设置后再导入应用模块
+    from app.main import app
+    from app.services.music_api import music_api_breaker, search_cache, song_detail_cache, song_url_cache
+
+    def clear_caches() -> None:
+        for cache in (search_cache, song_url_cache, song_detail_cache):
+            cache.clear()
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+            await run_scenarios(client, args, clear_caches)
+
+    for name, cache in (("search", search_cache), ("song_url", song_url_cache), ("song_detail", song_detail_cache)):
+        print(f"{name:<12} {cache.stats()}")
+    print(f"{'breaker':<12} {music_api_breaker.stats()}")
+    server.should_exit = True
+
+
+async def run_http_mode(args) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        # 无法清空远端服务的缓存
+        args.keep_cache = True
+        await run_scenarios(client, args, lambda: None)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="音乐接口压测")
+    argparser.add_argument("--mode", choices=["app", "http"], default="app")
+    argparser.add_argument("--url", default="http://127.0.0.1:8000", help="http模式下的服务地址")
+    argparser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    argparser.add_argument("--requests", type=int, default=1000, help="每个场景的总请求数")
+    argparser.add_argument("--concurrency", type=int, default=100, help="并发数")
+    argparser.add_argument("--keys", type=int, default=100, help="不同关键词/歌曲ID的数量")
+    argparser.add_argument("--detail-batch", type=int, default=20, help="detail场景每次请求的歌曲数")
+    argparser.add_argument("--keep-cache", action="store_true", help="场景之间不清空缓存")
+    argparser.add_argument("--stub-port", type=int, default=9200, help="app模式下音乐替身端口")
+    argparser.add_argument("--latency-ms", type=float, default=120)
+    argparser.add_argument("--jitter-ms", type=float, default=60)
+    argparser.add_argument("--error-rate", type=float, default=0.0)
+    argparser.add_argument("--hang-rate", type=float, default=0.0, help="音乐替身请求挂起的概率")
+    argparser.add_argument("--hang-seconds", type=float, default=30, help="音乐替身挂起时长（秒）")
+    args = argparser.parse_args()
+
+    if args.mode == "app":
+        os.environ["MUSIC_API_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}"
+        # 压测不需要数据库，关闭播放队列预取、详情回填和请求归档
+        os.environ["PLAYER_PREFETCH_ENABLED"] = "false"
+        os.environ["SONG_BACKFILL_ENABLED"] = "false"
+        os.environ["SONG_ARCHIVE_ENABLED"] = "false"
+        asyncio.run(run_app_mode(args))
+    else:
+        asyncio.run(run_http_mode(args))
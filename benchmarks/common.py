@@ -0,0 +1,60 @@
+"""基准脚本共用的统计与服务启动工具"""
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+import uvicorn
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """对已排序的数据取百分位（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def report(label: str, latencies: List[float], elapsed: float, errors: int = 0) -> None:
+    """打印一组请求的延迟分布和吞吐量（延迟单位：秒）"""
+    values = sorted(latencies)
+    total = len(values) + errors
+    throughput = total / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{label:<10} n={total:<6} err={errors:<4} "
+        f"p50={percentile(values, 50) * 1000:7.1f}ms "
+        f"p95={percentile(values, 95) * 1000:7.1f}ms "
+        f"p99={percentile(values, 99) * 1000:7.1f}ms "
+        f"吞吐={throughput:8.1f} req/s"
+    )
+
+
+async def drive(call: Callable[[int], Awaitable[bool]], total: int, concurrency: int) -> Tuple[List[float], int, float]:
+    """以固定并发度执行total次调用，返回(成功请求延迟, 失败数, 总耗时)"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            ok = await call(i)
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def serve_in_thread(app, host: str, port: int) -> uvicorn.Server:
+    """在后台线程中启动uvicorn服务，返回可用于停止的Server对象"""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
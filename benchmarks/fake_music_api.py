@@ -0,0 +1,119 @@
+"""
+本地音乐接口替身
+
+模拟 NeteaseCloudMusicApi 的 /search、/song/url、/song/detail，
+可配置延迟、抖动、5xx错误率和无响应（挂起）比例，用于离线压测音乐相关接口。
+相同的关键词或歌曲ID总是返回相同的数据。
+
+用法:
+    python -m benchmarks.fake_music_api --port 9200 --latency-ms 120 --jitter-ms 60
+    MUSIC_API_BASE_URL=http://127.0.0.1:9200 python run.py
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+
+def _song_id(keywords: str, index: int) -> int:
+    """由关键词和序号生成稳定的歌曲ID"""
+    digest = hashlib.sha1(f"{keywords}:{index}".encode("utf-8")).hexdigest()
+    return int(digest[:8], 16)
+
+
+def create_app(
+    latency_ms: float = 120,
+    jitter_ms: float = 60,
+    error_rate: float = 0.0,
+    hang_rate: float = 0.0,
+    hang_seconds: float = 30
+) -> FastAPI:
+    """创建音乐接口替身应用"""
+    app = FastAPI(title="Music API stub")
+
+    async def simulate():
+        """模拟上游延迟；返回非None时表示本次请求注入了错误"""
+        if random.random() < hang_rate:
+            await asyncio.sleep(hang_seconds)
+        delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        if random.random() < error_rate:
+            return JSONResponse(status_code=502, content={"code": 502, "msg": "bad gateway"})
+        return None
+
+    @app.get("/search")
+    async def search(
+        keywords: str = Query(...),
+        limit: int = Query(30),
+        offset: int = Query(0)
+    ):
+        error = await simulate()
+        if error is not None:
+            return error
+        songs = [
+            {
+                "id": _song_id(keywords, offset + i),
+                "name": f"{keywords} {offset + i}",
+                "artists": [{"name": f"Artist {i % 7}"}],
+                "album": {"name": f"Album {i % 5}"}
+            }
+            for i in range(limit)
+        ]
+        return {"code": 200, "result": {"songs": songs, "songCount": 300}}
+
+    @app.get("/song/url")
+    async def song_url(id: str = Query(...), br: int = Query(999000)):
+        error = await simulate()
+        if error is not None:
+            return error
+        return {
+            "code": 200,
+            "data": [{
+                "id": int(id),
+                "url": f"http://127.0.0.1/stream/{id}.mp3",
+                "br": min(br, 320000),
+                "size": 4000000,
+                "expi": 1200
+            }]
+        }
+
+    @app.get("/song/detail")
+    async def song_detail(ids: str = Query(...)):
+        error = await simulate()
+        if error is not None:
+            return error
+        songs = [
+            {
+                "id": int(song_id),
+                "name": f"Song {song_id}",
+                "ar": [{"name": f"Artist {int(song_id) % 7}"}],
+                "al": {"name": f"Album {int(song_id) % 5}", "picUrl": f"http://127.0.0.1/cover/{song_id}.jpg"},
+                "dt": 240000
+            }
+            for song_id in ids.split(",") if song_id
+        ]
+        return {"code": 200, "songs": songs}
+
+    return app
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="本地音乐接口替身")
+    argparser.add_argument("--host", default="127.0.0.1")
+    argparser.add_argument("--port", type=int, default=9200)
+    argparser.add_argument("--latency-ms", type=float, default=120, help="平均延迟（毫秒）")
+    argparser.add_argument("--jitter-ms", type=float, default=60, help="延迟抖动（毫秒）")
+    argparser.add_argument("--error-rate", type=float, default=0.0, help="返回502的概率")
+    argparser.add_argument("--hang-rate", type=float, default=0.0, help="请求挂起（模拟上游无响应）的概率")
+    argparser.add_argument("--hang-seconds", type=float, default=30, help="挂起时长（秒）")
+    args = argparser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.hang_rate, args.hang_seconds),
+        host=args.host,
+        port=args.port
+    )
@@ -0,0 +1,55 @@
+"""
+本地微信接口替身
+
+模拟 /sns/jscode2session，可配置延迟、抖动和“系统繁忙”错误率，
+用于离线压测登录流程。code 为 "invalid" 时返回 40029 错误。
+
+用法:
+    python -m benchmarks.stub_wechat --port 9100 --latency-ms 80 --jitter-ms 40
+    WECHAT_API_BASE_URL=http://127.0.0.1:9100 python run.py
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+
+import uvicorn
+from fastapi import FastAPI, Query
+
+
+def create_app(latency_ms: float = 80, jitter_ms: float = 40, error_rate: float = 0.0) -> FastAPI:
+    """创建微信接口替身应用"""
+    app = FastAPI(title="WeChat stub")
+
+    @app.get("/sns/jscode2session")
+    async def jscode2session(
+        appid: str = Query(...),
+        secret: str = Query(...),
+        js_code: str = Query(...),
+        grant_type: str = Query("authorization_code")
+    ):
+        delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        if js_code == "invalid":
+            return {"errcode": 40029, "errmsg": "invalid code"}
+        if random.random() < error_rate:
+            return {"errcode": -1, "errmsg": "system error"}
+
+        # 同一个code总是映射到同一个openid，便于重复压测
+        digest = hashlib.sha1(js_code.encode("utf-8")).hexdigest()[:20]
+        return {"openid": f"stub-{digest}", "session_key": digest}
+
+    return app
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="本地微信接口替身")
+    argparser.add_argument("--host", default="127.0.0.1")
+    argparser.add_argument("--port", type=int, default=9100)
+    argparser.add_argument("--latency-ms", type=float, default=80, help="平均延迟（毫秒）")
+    argparser.add_argument("--jitter-ms", type=float, default=40, help="延迟抖动（毫秒）")
+    argparser.add_argument("--error-rate", type=float, default=0.0, help="返回系统繁忙的概率")
+    args = argparser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate), host=args.host, port=args.port)
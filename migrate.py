@@ -19,7 +19,7 @@ PG_DB = os.getenv("POSTGRES_DB", "miniapp")
 # SQLite数据库文件
 SQLITE_DB = "database.db"
 
-def create_postgres_tables(delete_existing: bool):
+def create_postgres_tables(delete_existing: bool, reject_duplicates: bool = False):
     """创建PostgreSQL数据库表"""
     print(f"连接到PostgreSQL数据库: {PG_DB} at {PG_HOST}:{PG_PORT} as user {PG_USER}")
     conn = psycopg2.connect(
@@ -35,6 +35,7 @@ def create_postgres_tables(delete_existing: bool):
     if delete_existing:
         cursor.execute("DROP TABLE IF EXISTS users CASCADE")
         cursor.execute("DROP TABLE IF EXISTS song_requests CASCADE")
+        cursor.execute("DROP TABLE IF EXISTS song_requests_archive CASCADE")
         cursor.execute("DROP TABLE IF EXISTS refresh_tokens CASCADE")
         cursor.execute("DROP TABLE IF EXISTS wall_messages CASCADE")
         cursor.execute("DROP TABLE IF EXISTS comments CASCADE")
@@ -62,7 +63,11 @@ def create_postgres_tables(delete_existing: bool):
             user_id INTEGER NOT NULL,
             song_id VARCHAR(50) NOT NULL,
             song_name VARCHAR(500) NOT NULL,
-            status VARCHAR(10) NOT NULL CHECK (status IN ('pending', 'approved', 'rejected', 'played')),
+            title VARCHAR(500),
+            artist VARCHAR(500),
+            duration INTEGER,
+            cover VARCHAR(1000),
+            status VARCHAR(10) NOT NULL CHECK (status IN ('pending', 'approved', 'rejected', 'playing', 'played')),
             request_time TIMESTAMP NOT NULL,
             review_time TIMESTAMP,
             review_reason TEXT,
@@ -72,6 +77,28 @@ def create_postgres_tables(delete_existing: bool):
             FOREIGN KEY (user_id) REFERENCES users(id)
         )
     """)
+
+    # 创建song_requests_archive表：超过归档期限的已驳回/已播放请求整行移入，保留原ID
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS song_requests_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            song_id VARCHAR(50) NOT NULL,
+            song_name VARCHAR(500) NOT NULL,
+            title VARCHAR(500),
+            artist VARCHAR(500),
+            duration INTEGER,
+            cover VARCHAR(1000),
+            status VARCHAR(10) NOT NULL CHECK (status IN ('rejected', 'played')),
+            request_time TIMESTAMP NOT NULL,
+            review_time TIMESTAMP,
+            review_reason TEXT,
+            reviewer_id INTEGER,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
     
     # 创建refresh_tokens表
     cursor.execute("""
@@ -102,11 +129,25 @@ def create_postgres_tables(delete_existing: bool):
             view_count INTEGER NOT NULL DEFAULT 0,
             like_count INTEGER NOT NULL DEFAULT 0,
             timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            search_text TEXT GENERATED ALWAYS AS (coalesce(title, '') || '\x1f' || content || '\x1f' || coalesce(tags, '')) STORED,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id)
         )
     """)
+    # 已有的表补上搜索文本生成列（添加时由数据库为所有行计算）；
+    # 字段之间以单元分隔符\x1f拼接，旧版以空格拼接的列先删除重建，关键词匹配不会跨越字段边界
+    cursor.execute("""
+        SELECT generation_expression FROM information_schema.columns
+        WHERE table_name = 'wall_messages' AND column_name = 'search_text'
+    """)
+    existing = cursor.fetchone()
+    if existing and existing[0] and "\x1f" not in existing[0]:
+        cursor.execute("ALTER TABLE wall_messages DROP COLUMN search_text")
+    cursor.execute("""
+        ALTER TABLE wall_messages ADD COLUMN IF NOT EXISTS search_text TEXT
+        GENERATED ALWAYS AS (coalesce(title, '') || '\x1f' || content || '\x1f' || coalesce(tags, '')) STORED
+    """)
 
     # 创建comments表
     cursor.execute("""
@@ -129,14 +170,131 @@ def create_postgres_tables(delete_existing: bool):
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_openid ON users(wechat_openid)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_student_id ON users(student_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_user_id ON song_requests(user_id)")
+    # 已有的表补上歌曲详情列（由应用在后台回填）
+    for column in ("title VARCHAR(500)", "artist VARCHAR(500)", "duration INTEGER", "cover VARCHAR(1000)"):
+        cursor.execute(f"ALTER TABLE song_requests ADD COLUMN IF NOT EXISTS {column}")
+    # 先按"歌手 - 歌名"格式解析出歌名和歌手，时长和封面由应用在后台回填
+    cursor.execute("""
+        UPDATE song_requests SET
+            artist = CASE WHEN strpos(song_name, ' - ') > 0
+                THEN btrim(split_part(song_name, ' - ', 1)) ELSE '未知艺术家' END,
+            title = CASE WHEN strpos(song_name, ' - ') > 0
+                THEN btrim(substr(song_name, strpos(song_name, ' - ') + 3)) ELSE song_name END
+        WHERE title IS NULL
+    """)
+    # 后台回填任务按ID倒序查找尚未回填详情（duration为空）的请求
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_missing_duration ON song_requests(id) WHERE duration IS NULL")
+    # 已有的表补上playing状态
+    cursor.execute("ALTER TABLE song_requests DROP CONSTRAINT IF EXISTS song_requests_status_check")
+    cursor.execute("""
+        ALTER TABLE song_requests ADD CONSTRAINT song_requests_status_check
+        CHECK (status IN ('pending', 'approved', 'rejected', 'playing', 'played'))
+    """)
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_status ON song_requests(status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_status_time ON song_requests(status, request_time, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_time ON song_requests(request_time, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_user_status_time ON song_requests(user_id, status, request_time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_song_id ON song_requests(song_id)")
+    # 部分唯一索引要求同一首歌最多一条待审核/已批准请求。已有重复时默认列出冲突的请求ID并退出，
+    # 指定--reject-duplicate-requests时保留最早的一条，其余驳回
+    cursor.execute("""
+        SELECT song_id, array_agg(id ORDER BY id)
+        FROM song_requests
+        WHERE status IN ('pending', 'approved')
+        GROUP BY song_id
+        HAVING count(*) > 1
+    """)
+    duplicates = cursor.fetchall()
+    for song_id, request_ids in duplicates:
+        print(f"歌曲 {song_id} 有多条待审核/已批准请求: {request_ids}")
+    if duplicates and not reject_duplicates:
+        conn.rollback()
+        conn.close()
+        raise SystemExit("存在重复的待审核/已批准点歌请求，无法创建唯一索引。请手动处理，或使用 --reject-duplicate-requests 保留最早的一条并驳回其余")
+    if duplicates:
+        print(f"驳回{sum(len(request_ids) - 1 for _, request_ids in duplicates)}条重复请求（每首歌保留最早的一条）")
+    cursor.execute("""
+        UPDATE song_requests a
+        SET status = 'rejected', review_reason = '重复点歌', review_time = NOW()
+        FROM song_requests b
+        WHERE a.song_id = b.song_id AND a.id > b.id
+          AND a.status IN ('pending', 'approved') AND b.status IN ('pending', 'approved')
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uix_song_requests_active_song_id
+        ON song_requests(song_id) WHERE status IN ('pending', 'approved')
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_archive_status_time ON song_requests_archive(status, request_time, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_archive_time ON song_requests_archive(request_time, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_song_requests_archive_user_time ON song_requests_archive(user_id, request_time)")
+    # 已有数据一次性归档：早于SONG_ARCHIVE_AFTER_DAYS天的已驳回/已播放请求移入归档表，之后由应用定期归档。
+    # 不使用ON CONFLICT：ID冲突时整条语句回滚，避免行从热表删除却没有写入归档表
+    archive_after_days = int(os.getenv("SONG_ARCHIVE_AFTER_DAYS", "30"))
+    if archive_after_days < 1:
+        conn.rollback()
+        conn.close()
+        raise SystemExit(f"SONG_ARCHIVE_AFTER_DAYS必须大于等于1，当前为{archive_after_days}")
+    cursor.execute("""
+        WITH moved AS (
+            DELETE FROM song_requests
+            WHERE status IN ('rejected', 'played')
+              AND request_time < NOW() - make_interval(days => %s)
+            RETURNING id, user_id, song_id, song_name, title, artist, duration, cover, status,
+                      request_time, review_time, review_reason, reviewer_id, created_at, updated_at
+        )
+        INSERT INTO song_requests_archive (
+            id, user_id, song_id, song_name, title, artist, duration, cover, status,
+            request_time, review_time, review_reason, reviewer_id, created_at, updated_at
+        )
+        SELECT * FROM moved
+    """, (archive_after_days,))
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_refresh_tokens_openid ON refresh_tokens(openid)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_refresh_tokens_token_id ON refresh_tokens(token_id)")
+    # 每个openid只保留最新的一条刷新令牌，以支持按openid的原子upsert/轮换
+    cursor.execute("""
+        DELETE FROM refresh_tokens a
+        USING refresh_tokens b
+        WHERE a.openid = b.openid AND a.id < b.id
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uix_refresh_tokens_openid ON refresh_tokens(openid)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_wall_messages_user_id ON wall_messages(user_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_wall_messages_status ON wall_messages(status)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_wall_messages_type ON wall_messages(message_type)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_wall_messages_timestamp ON wall_messages(timestamp)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_wall_messages_like_count ON wall_messages(like_count)")
+    # 校园墙关键词搜索：3个字符及以上的关键词使用pg_trgm三元组GIN索引。
+    # pg_trgm只把当前LC_CTYPE认定为字母的字符切分为三元组，C/POSIX locale下中文会被忽略
+    # （子串匹配退化为全表扫描，word_similarity恒为0，排序只剩发布时间），数据库需使用UTF-8的locale，如zh_CN.UTF-8
+    cursor.execute("SELECT datctype FROM pg_database WHERE datname = current_database()")
+    lc_ctype = cursor.fetchone()[0]
+    if lc_ctype in ("C", "POSIX"):
+        print(f"警告: 数据库的LC_CTYPE为{lc_ctype}，pg_trgm无法切分中文，请使用zh_CN.UTF-8等UTF-8 locale创建数据库")
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_wall_messages_search_trgm ON wall_messages USING gin (search_text gin_trgm_ops)")
+    # 1~2个汉字的关键词无法使用三元组索引：为每条消息提取全部由汉字组成的单字和双字（与app/db/models/wall.py中的
+    # WALL_SEARCH_GRAMS_FUNCTION一致），在表达式上建GIN索引，查询时用 wall_search_grams(search_text) @> ARRAY[关键词] 命中。
+    # 函数定义变化后，已有的表达式索引需要重建
+    cursor.execute("SELECT prosrc FROM pg_proc WHERE proname = 'wall_search_grams'")
+    previous = cursor.fetchone()
+    cursor.execute(r"""
+        CREATE OR REPLACE FUNCTION wall_search_grams(doc TEXT) RETURNS TEXT[]
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT coalesce(array_agg(DISTINCT gram), '{}')
+            FROM (
+                SELECT substr(doc, i, n) AS gram
+                FROM generate_series(1, char_length(doc)) AS i, (VALUES (1), (2)) AS sizes(n)
+                WHERE i + n - 1 <= char_length(doc)
+            ) grams
+            WHERE gram ~ '^[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+$'
+        $$
+    """)
+    cursor.execute("SELECT prosrc FROM pg_proc WHERE proname = 'wall_search_grams'")
+    current = cursor.fetchone()
+    cursor.execute("SELECT to_regclass('idx_wall_messages_search_grams')")
+    if previous and previous[0] != current[0] and cursor.fetchone()[0]:
+        print("wall_search_grams定义已变化，重建idx_wall_messages_search_grams")
+        cursor.execute("REINDEX INDEX idx_wall_messages_search_grams")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_wall_messages_search_grams ON wall_messages USING gin (wall_search_grams(search_text))")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_wall_messages_view_count ON wall_messages(view_count)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_user_id ON comments(user_id)");
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_like_count ON comments(like_count)");
@@ -234,6 +392,8 @@ def migrate_song_requests():
     imported_count = 0
     
     for req in song_requests:
+        # 单条失败（如与已有的待审核/已批准请求重复）只回滚这一条
+        pg_cursor.execute("SAVEPOINT song_request")
         try:
             # 如果review_time为NULL，则设置为NULL
             review_time = req['review_time'] if req['review_time'] else None
@@ -244,7 +404,8 @@ def migrate_song_requests():
                     id, user_id, song_id, status, request_time, review_time, review_reason, reviewer_id,
                     created_at, updated_at
                 )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                WHERE NOT EXISTS (SELECT 1 FROM song_requests_archive WHERE id = %s)
                 ON CONFLICT (id) DO NOTHING
             """, (
                 req['id'], 
@@ -256,13 +417,15 @@ def migrate_song_requests():
                 req['review_reason'],
                 req['reviewer_id'],
                 datetime.datetime.now(),
-                datetime.datetime.now()
+                datetime.datetime.now(),
+                req['id']
             ))
             
             imported_count += 1
             print(f"迁移歌曲请求ID: {req['id']} 成功")
             
         except Exception as e:
+            pg_cursor.execute("ROLLBACK TO SAVEPOINT song_request")
             print(f"迁移歌曲请求ID: {req['id']} 失败: {str(e)}")
     
     pg_conn.commit()
@@ -315,7 +478,7 @@ def migrate_refresh_tokens():
                     id, openid, token_id, expires_at, created_at, updated_at
                 )
                 VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (openid, token_id) DO NOTHING
+                ON CONFLICT DO NOTHING
             """, (
                 token['id'], 
                 token['openid'], 
@@ -341,12 +504,13 @@ def migrate_refresh_tokens():
 if __name__ == "__main__":
     argparser = argparse.ArgumentParser(description="数据库迁移脚本")
     argparser.add_argument('--delete', action='store_true', help='删除现有的PostgreSQL表并重新创建')
+    argparser.add_argument('--reject-duplicate-requests', action='store_true', help='同一首歌有多条待审核/已批准请求时，保留最早的一条并驳回其余')
     args = argparser.parse_args()
     if args.delete:
         print("删除现有的PostgreSQL表...")
 
     # 创建PostgreSQL数据库表
-    create_postgres_tables(args.delete)
+    create_postgres_tables(args.delete, args.reject_duplicate_requests)
     
     # 迁移数据
     migrate_users()
@@ -0,0 +1,85 @@
+"""
+进程内TTL + LRU缓存测试：新鲜期、陈旧期、过期和按最久未使用淘汰
+"""
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+
+    clock.now += 4.9
+    assert cache.get("a") == 1
+
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert cache.lookup("a") is None
+    assert len(cache) == 0
+
+
+def test_stale_window(clock):
+    cache = TTLCache(maxsize=10, ttl=5, stale_ttl=10)
+    cache.set("a", 1)
+
+    clock.now += 6
+    # 陈旧的条目get读不到，lookup返回并标记为陈旧
+    assert cache.get("a") is None
+    assert cache.lookup("a") == (1, True)
+
+    clock.now += 9
+    assert cache.lookup("a") is None
+    assert cache.stats()["stale_hits"] == 2
+    assert cache.stats()["hits"] == 0
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    cache = TTLCache(maxsize=10, ttl=60, stale_ttl=60)
+    cache.set("a", 1, ttl=1, stale_ttl=0)
+
+    clock.now += 1
+    assert cache.lookup("a") is None
+
+
+def test_lru_eviction(clock):
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # 读取a之后，b成为最久未使用的条目
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_peek_does_not_touch_lru_order_or_stats(clock):
+    cache = TTLCache(maxsize=2, ttl=5, stale_ttl=5)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.peek("a") == (1, False)
+    cache.set("c", 3)
+
+    assert cache.peek("a") is None
+    clock.now += 6
+    assert cache.peek("c") == (3, True)
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 0
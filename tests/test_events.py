@@ -0,0 +1,111 @@
+"""
+SSE事件广播测试：断线续传补发错过的事件，且每个事件只推送一次
+"""
+import asyncio
+from typing import List
+
+from app.services.events import EventBroker
+
+
+def event_ids(messages: List[str]) -> List[str]:
+    return [
+        message.split("\n", 1)[0][len("id: "):]
+        for message in messages
+        if message.startswith("id: ")
+    ]
+
+
+def event_names(messages: List[str]) -> List[str]:
+    return [
+        line[len("event: "):]
+        for message in messages
+        for line in message.split("\n")
+        if line.startswith("event: ")
+    ]
+
+
+async def collect(stream, count: int) -> List[str]:
+    """读取count条消息（不含心跳）"""
+    messages = []
+    while len(messages) < count:
+        message = await asyncio.wait_for(stream.__anext__(), timeout=1)
+        if not message.startswith(":"):
+            messages.append(message)
+    return messages
+
+
+async def drain(stream) -> List[str]:
+    """读取到下一次心跳为止的消息，即当前已排队的全部事件"""
+    messages = []
+    while True:
+        message = await asyncio.wait_for(stream.__anext__(), timeout=1)
+        if message.startswith(":"):
+            return messages
+        messages.append(message)
+
+
+def run(scenario):
+    async def main():
+        broker = EventBroker(buffer_size=8, queue_size=8, heartbeat=0.05)
+        broker.bind(asyncio.get_running_loop())
+        return await scenario(broker)
+    return asyncio.run(main())
+
+
+def test_replay_then_live_without_duplicates():
+    async def scenario(broker):
+        for name in ("requested", "approved", "playing"):
+            broker.publish(name, {})
+        stream = broker.stream(f"{broker._epoch}-1")
+        messages = await collect(stream, 1)
+        # 订阅已注册，补发的事件尚未发出时又来了新事件
+        broker.publish("played", {})
+        messages += await drain(stream)
+        await stream.aclose()
+        return broker, messages
+
+    broker, messages = run(scenario)
+    assert messages[0].startswith("retry: ")
+    assert event_names(messages) == ["approved", "playing", "played"]
+    ids = event_ids(messages)
+    assert ids == [f"{broker._epoch}-{seq}" for seq in (2, 3, 4)]
+
+
+def test_unknown_epoch_gets_reset():
+    async def scenario(broker):
+        broker.publish("requested", {})
+        stream = broker.stream("00000000-1")
+        messages = await collect(stream, 2)
+        broker.publish("approved", {})
+        messages += await collect(stream, 1)
+        await stream.aclose()
+        return messages
+
+    assert event_names(run(scenario)) == ["reset", "approved"]
+
+
+def test_event_older_than_buffer_gets_reset():
+    async def scenario(broker):
+        for _ in range(20):
+            broker.publish("requested", {})
+        stream = broker.stream(f"{broker._epoch}-1")
+        messages = await collect(stream, 2)
+        await stream.aclose()
+        return messages
+
+    assert event_names(run(scenario)) == ["reset"]
+
+
+def test_slow_subscriber_gets_reset():
+    async def scenario(broker):
+        stream = broker.stream()
+        messages = await collect(stream, 1)
+        for _ in range(broker.queue_size + 1):
+            broker.publish("requested", {})
+        messages += await collect(stream, 1)
+        await stream.aclose()
+        return broker, messages
+
+    broker, messages = run(scenario)
+    assert event_names(messages) == ["reset"]
+    assert broker.stats()["subscribers"] == 0
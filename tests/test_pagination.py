@@ -0,0 +1,41 @@
+"""
+分页游标测试：编码后能原样解析，格式错误的游标被拒绝
+"""
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from app.db.repositories.song_request import decode_cursor, encode_cursor
+
+
+def b64(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+@pytest.mark.parametrize("request_time, request_id", [
+    (datetime(2024, 1, 1, 8, 30), 1),
+    (datetime(2024, 12, 31, 23, 59, 59, 999999), 2**31 - 1),
+])
+def test_round_trip(request_time, request_id):
+    cursor = encode_cursor(request_time, request_id)
+    assert decode_cursor(cursor) == (request_time, request_id)
+    # 游标会放在查询参数中，必须是URL安全的
+    assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor",
+    "游标",
+    b64("{}"),
+    b64("[]"),
+    b64(json.dumps(["2024-01-01T00:00:00"])),
+    b64(json.dumps(["yesterday", 1])),
+    b64(json.dumps(["2024-01-01T00:00:00", "abc"])),
+    b64(json.dumps(["2024-01-01T00:00:00", 1, 2])),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
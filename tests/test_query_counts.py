@@ -0,0 +1,137 @@
+"""
+列表接口的SQL条数测试
+
+开发模式下每个响应带有X-Query-Count头（start_query_count的计数）。
+分别写入N条和2N条点歌请求，用不同的分页大小请求同一接口，SQL条数必须相同，
+否则说明出现了按行执行的查询（N+1）。
+"""
+import os
+
+os.environ["DEVELOP_MODE"] = "true"
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, Integer, Table, create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.querycount import install_query_counter
+from app.core.security import require_admin
+from app.db.models import SongRequest, SongRequestArchive, User
+from app.db.repositories.song_request import invalidate_song_snapshots
+from app.db.session import Base, get_db
+from app.main import app
+from app.schemas.user import UserSnapshot
+
+# song_requests.reviewer_id引用的admins表不在模型中，测试库中补一个占位表
+if "admins" not in Base.metadata.tables:
+    Table("admins", Base.metadata, Column("id", Integer, primary_key=True))
+
+N = 10
+STATUSES = ["pending", "approved", "rejected", "played"]
+
+
+def seed(session, count: int) -> None:
+    """写入count个用户，每个用户一条点歌请求；另写入count条已归档的请求"""
+    now = datetime.now()
+    for i in range(count):
+        user = User(name=f"用户{i}", student_id=f"{i:08d}")
+        session.add(user)
+        session.flush()
+        session.add(SongRequest(
+            user_id=user.id,
+            song_id=str(i),
+            song_name=f"歌手{i} - 歌曲{i}",
+            status=STATUSES[i % len(STATUSES)],
+            request_time=now - timedelta(minutes=i)
+        ))
+        session.add(SongRequestArchive(
+            id=100000 + i,
+            user_id=user.id,
+            song_id=str(i),
+            song_name=f"歌手{i} - 歌曲{i}",
+            status="played",
+            request_time=now - timedelta(days=60, minutes=i)
+        ))
+    session.commit()
+
+
+@pytest.fixture
+def client_for():
+    """返回一个工厂：按给定的请求数新建数据库并返回(测试客户端, 一条已批准请求的ID)"""
+    def build(count: int):
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        install_query_counter(engine)
+        Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+        session = Session()
+        seed(session, count)
+        approved_id = session.query(SongRequest.id).filter(SongRequest.status == "approved").first()[0]
+        session.close()
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[require_admin] = lambda: UserSnapshot(id=1, student_id="admin", name="admin", is_admin=True)
+        # 缓存是进程级的，每个数据库重新开始
+        invalidate_song_snapshots()
+        return TestClient(app), approved_id
+
+    yield build
+    app.dependency_overrides.clear()
+    invalidate_song_snapshots()
+
+
+def query_count(response) -> int:
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-Query-Count"])
+
+
+@pytest.mark.parametrize("path", ["/api/songs/admin/history", "/api/songs/admin/pending"])
+def test_listing_query_count_independent_of_page_size(client_for, path):
+    counts = []
+    for count, page_size in ((N, N // 2), (2 * N, 2 * N)):
+        client, _ = client_for(count)
+        response = client.get(path, params={"page_size": page_size})
+        counts.append(query_count(response))
+        # 第二页走游标分页
+        cursor = response.json()["next_cursor"]
+        if cursor:
+            invalidate_song_snapshots()
+            counts.append(query_count(client.get(path, params={"page_size": page_size, "cursor": cursor})))
+    assert len(set(counts)) == 1, counts
+
+
+def test_player_queue_query_count_independent_of_queue_length(client_for):
+    counts = []
+    for count in (N, 2 * N):
+        client, _ = client_for(count)
+        counts.append(query_count(client.get("/api/player/queue")))
+    assert len(set(counts)) == 1, counts
+
+
+def test_player_playing_query_count_independent_of_table_size(client_for):
+    counts = []
+    for count in (N, 2 * N):
+        client, approved_id = client_for(count)
+        counts.append(query_count(client.post("/api/player/playing", json={"request_id": approved_id})))
+    assert len(set(counts)) == 1, counts
+
+
+def test_review_returns_requester_in_one_statement(client_for):
+    client, _ = client_for(N)
+    # 第一条点歌请求（ID为1）是待审核的，属于用户0
+    response = client.put("/api/songs/admin/review/1", json={"status": "approved", "reason": ""})
+    assert query_count(response) == 1
+    body = response.json()
+    assert body["status"] == "approved"
+    assert body["user_name"] == "用户0"
+    assert body["user_student_id"] == "00000000"
@@ -0,0 +1,83 @@
+"""
+点歌滑动窗口限流器测试：窗口、撤销和不活跃key的清扫
+"""
+import pytest
+
+from app.core import ratelimit as ratelimit_module
+from app.core.ratelimit import SlidingWindowLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ratelimit_module, "time", fake)
+    return fake
+
+
+def test_quota_within_window(clock):
+    limiter = SlidingWindowLimiter(window_seconds=60, quota=2)
+    assert limiter.allow("user")
+    limiter.record("user", 1)
+    limiter.record("user", 2)
+    assert not limiter.allow("user")
+
+    clock.now += 60
+    assert limiter.allow("user")
+
+
+def test_discard_releases_quota(clock):
+    limiter = SlidingWindowLimiter(window_seconds=60, quota=1)
+    limiter.record("user", 1)
+    assert not limiter.allow("user")
+
+    limiter.discard("user", 1)
+    assert limiter.allow("user")
+    assert len(limiter) == 0
+
+
+def test_discard_only_removes_matching_event(clock):
+    limiter = SlidingWindowLimiter(window_seconds=60, quota=2)
+    limiter.record("user", 1)
+    limiter.record("user", 2)
+
+    limiter.discard("user", 3)
+    assert not limiter.allow("user")
+    limiter.discard("user", 1)
+    assert limiter.allow("user")
+    assert len(limiter) == 1
+
+
+def test_sweep_removes_inactive_keys(clock):
+    limiter = SlidingWindowLimiter(window_seconds=60, quota=1)
+    for user_id in range(100):
+        limiter.record(user_id, user_id)
+    assert len(limiter) == 100
+
+    # 不到一个窗口时不清扫
+    clock.now += 30
+    limiter.allow("other")
+    assert len(limiter) == 100
+
+    clock.now += 31
+    limiter.allow("other")
+    assert len(limiter) == 0
+
+
+def test_reset_rebuilds_state(clock):
+    limiter = SlidingWindowLimiter(window_seconds=60, quota=1)
+    limiter.record("stale", 1)
+
+    limiter.reset([("user", 10, clock.now - 30)])
+    assert limiter.allow("stale")
+    assert not limiter.allow("user")
+
+    clock.now += 30
+    assert limiter.allow("user")
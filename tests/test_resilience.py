@@ -0,0 +1,188 @@
+"""
+请求合并与熔断器测试
+
+同一个key上的并发调用只能触发一次上游请求，所有调用方拿到同一个结果或同一个异常；
+熔断器按 关闭 -> 打开 -> 半开 -> 关闭/打开 转换状态。
+"""
+import asyncio
+
+import pytest
+
+from app.core import resilience as resilience_module
+from app.core.resilience import AsyncSingleFlight, CircuitBreaker
+
+CALLERS = 20
+
+
+class UpstreamError(Exception):
+    pass
+
+
+def run_concurrently(fn):
+    """在同一个key上并发调用CALLERS次，返回(各调用方的结果或异常, 上游调用次数)"""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        # 让出事件循环，保证其余调用方在上游返回前到达
+        await asyncio.sleep(0.01)
+        return await fn()
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.do("key", upstream) for _ in range(CALLERS)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    return results, len(calls), flight
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    async def fetch():
+        return {"songs": []}
+
+    results, calls, flight = run_concurrently(fetch)
+
+    assert calls == 1
+    assert len(results) == CALLERS
+    assert all(result is results[0] for result in results)
+    assert flight._inflight == {}
+
+
+def test_concurrent_callers_share_the_same_exception():
+    error = UpstreamError("upstream down")
+
+    async def fetch():
+        raise error
+
+    results, calls, flight = run_concurrently(fetch)
+
+    assert calls == 1
+    assert all(result is error for result in results)
+    assert flight._inflight == {}
+
+
+def test_next_call_after_completion_hits_upstream_again():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await flight.do("key", upstream)
+        second = await flight.do("key", upstream)
+        return first, second
+
+    assert asyncio.run(main()) == (1, 2)
+
+
+def test_cancelled_caller_does_not_cancel_other_waiters():
+    flight = AsyncSingleFlight()
+    release = None
+
+    async def upstream():
+        await release.wait()
+        return "ok"
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.ensure_future(flight.do("key", upstream))
+        second = asyncio.ensure_future(flight.do("key", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "ok"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience_module, "time", fake)
+    return fake
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    open_breaker(breaker)
+
+    clock.now += 9.9
+    assert not breaker.allow()
+
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 半开状态只放行一个探测请求
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    open_breaker(breaker)
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow()
+
+
+def test_unfinished_probe_lets_next_probe_through_after_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    open_breaker(breaker)
+
+    clock.now += 10
+    assert breaker.allow()
+    # 探测请求被取消，既没有成功也没有失败
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN